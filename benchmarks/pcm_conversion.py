@@ -0,0 +1,52 @@
+"""Micro-benchmark for float -> 16-bit PCM conversion used by Pocket TTS.
+
+Compares the old list comprehension + struct.pack conversion with the vectorized
+numpy conversion for 1, 10 and 60 seconds of 24kHz audio.
+
+Run from the repo root: python benchmarks/pcm_conversion.py
+"""
+import os
+import math
+import struct
+import timeit
+import importlib.util
+
+import numpy as np
+
+# Load tts/pcm.py on its own, the tts package pulls in every engine and their dependencies
+_spec = importlib.util.spec_from_file_location(
+    "pcm", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "tts", "pcm.py")
+)
+_pcm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_pcm)
+float_to_pcm16 = _pcm.float_to_pcm16
+
+SAMPLE_RATE = 24000
+DURATIONS = [1, 10, 60]
+
+
+def legacy_float_to_pcm16(samples) -> bytes:
+    scaled = [max(-32768, min(32767, int(s * 32767))) for s in samples]
+    return struct.pack("<" + "h" * len(scaled), *scaled)
+
+
+def make_samples(seconds: int) -> list[float]:
+    # Pocket TTS bindings hand back python lists of floats
+    return [0.8 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE) for i in range(seconds * SAMPLE_RATE)]
+
+
+def main():
+    print(f"{'audio':>8} {'legacy (ms)':>12} {'numpy (ms)':>12} {'speedup':>8}")
+    for seconds in DURATIONS:
+        samples = make_samples(seconds)
+        # float32 math may round differently from python floats by a single LSB
+        diff = np.frombuffer(legacy_float_to_pcm16(samples), "<i2").astype(np.int32) - np.frombuffer(float_to_pcm16(samples), "<i2")
+        assert np.abs(diff).max() <= 1
+        number = max(1, 10 // seconds)
+        legacy = min(timeit.repeat(lambda: legacy_float_to_pcm16(samples), number=number, repeat=3)) / number
+        vectorized = min(timeit.repeat(lambda: float_to_pcm16(samples), number=number, repeat=3)) / number
+        print(f"{seconds:>7}s {legacy * 1000:>12.2f} {vectorized * 1000:>12.2f} {legacy / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Benchmark for the TTS engines' `get_stream`.
+
+Runs every engine over a fixed corpus of short, medium and long messages and records, per message:
+time to first chunk, total synthesis time, real-time factor (synthesis time / audio time), bytes
+produced, plus the engine's init time and the peak RSS of the process it ran in.
+
+Each engine runs in its own subprocess so peak RSS is per engine. StreamElements and ElevenLabs run
+against local stand-in servers started here, so results don't depend on the network or use credits.
+Pocket TTS only runs when a model is configured and --pocket-voice is given.
+
+Run from the repo root:
+    python benchmarks/tts_engines.py [--engines local,streamelements,elevenlabs,pocket] [--output results.json]
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ENGINES = ["local", "streamelements", "elevenlabs", "pocket"]
+
+CORPUS = {
+    "short": "Roll for initiative!",
+    "medium": (
+        "The tavern door creaks open and a hooded figure steps inside, shaking the rain from their cloak. "
+        "Every conversation stops."
+    ),
+    "long": (
+        "We followed the river north for three days, past the burned mill and the old watchtower, until the "
+        "forest thinned and the mountains rose up in front of us like a wall. The dwarf insisted the pass was "
+        "safe this time of year, but the bard kept humming that song about the avalanche, and nobody slept well. "
+        "On the fourth morning we found tracks in the snow, too large for wolves and far too deliberate for bears. "
+        "Whatever made them had been watching our camp."
+    ),
+}
+
+# Stand-in server behaviour, roughly what the real services do
+STANDIN_LATENCY = 0.15  # seconds before the first byte
+STANDIN_SPEED = 4.0  # audio seconds produced per wall second
+SECONDS_PER_CHAR = 0.065
+ELEVENLABS_RATE = 22050
+
+
+def peak_rss_bytes() -> int:
+    if sys.platform == "win32":
+        import ctypes  # pylint: disable=import-outside-toplevel
+        from ctypes import wintypes  # pylint: disable=import-outside-toplevel
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        )
+        return counters.PeakWorkingSetSize
+
+    import resource  # pylint: disable=import-outside-toplevel
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+#### Stand-in servers ####
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    mp3_cache: dict[int, bytes] = {}
+    mp3_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _mp3(self, seconds: float) -> bytes:
+        from pydub.generators import Sine  # pylint: disable=import-outside-toplevel
+
+        ms = int(seconds * 1000)
+        with self.mp3_lock:
+            if ms not in self.mp3_cache:
+                output = io.BytesIO()
+                Sine(220).to_audio_segment(duration=ms, volume=-12).export(output, format="mp3")
+                self.mp3_cache[ms] = output.getvalue()
+            return self.mp3_cache[ms]
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        # StreamElements: GET /speech?voice=...&text=... returns a whole mp3
+        url = urlparse(self.path)
+        if url.path != "/speech":
+            self.send_error(404)
+            return
+        text = parse_qs(url.query).get("text", [""])[0]
+        seconds = max(0.5, len(text) * SECONDS_PER_CHAR)
+        time.sleep(STANDIN_LATENCY + seconds / STANDIN_SPEED)
+        body = self._mp3(seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        # ElevenLabs: POST /v1/text-to-speech/{voice_id}/stream streams raw PCM as it is "generated"
+        url = urlparse(self.path)
+        if not (url.path.startswith("/v1/text-to-speech/") and url.path.endswith("/stream")):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        text = json.loads(self.rfile.read(length) or b"{}").get("text", "")
+        samples = int(max(0.5, len(text) * SECONDS_PER_CHAR) * ELEVENLABS_RATE)
+        pcm = b"\x00\x00" * samples
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/pcm")
+        self.send_header("Content-Length", str(len(pcm)))
+        self.end_headers()
+        time.sleep(STANDIN_LATENCY)
+        step = ELEVENLABS_RATE * 2 // 10  # 100ms of audio per write
+        for offset in range(0, len(pcm), step):
+            self.wfile.write(pcm[offset : offset + step])
+            self.wfile.flush()
+            time.sleep(0.1 / STANDIN_SPEED)
+
+
+def start_standin_server(handler: type[BaseHTTPRequestHandler] = StandInHandler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, name="Bench-StandIn", daemon=True)
+    thread.start()
+    return server
+
+
+#### Engine runs (child process) ####
+
+
+def _setup_app(workdir: str):
+    # Same initialization main.py does, against a throwaway config, cache and DB
+    os.environ.setdefault("TCDND_DEBUG_MODE", "0")
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+    os.chdir(workdir)
+
+    import static_ffmpeg  # pylint: disable=import-outside-toplevel
+
+    static_ffmpeg.add_paths()
+
+    from helpers.instance_manager import init_cache, init_config  # pylint: disable=import-outside-toplevel
+    from db import initialize_database  # pylint: disable=import-outside-toplevel
+
+    config = init_config(name="default", path=os.path.join(workdir, "config.ini"))
+    config.set(section="CACHE", option="enabled", value="false")
+    config.set(section="CACHE", option="directory", value=os.path.join(workdir, "cache"))
+    init_cache(name="default", path=os.path.join(workdir, "cache"))
+    init_cache(name="tts", path=os.path.join(workdir, "cache", "tts"))
+    asyncio.run(initialize_database())
+    return config
+
+
+def _create_engine(engine: str, args):
+    from tts import LocalTTS, StreamElementsTTS, ElevenLabsTTS, PocketTTS  # pylint: disable=import-outside-toplevel
+
+    if engine == "local":
+        return LocalTTS(), ""
+    if engine == "streamelements":
+        tts = StreamElementsTTS()
+        tts.url = f"{args.standin_url}/speech?"
+        return tts, "se.Brian"
+    if engine == "elevenlabs":
+        from elevenlabs.client import AsyncElevenLabs  # pylint: disable=import-outside-toplevel
+        from elevenlabs.environment import ElevenLabsEnvironment  # pylint: disable=import-outside-toplevel
+
+        tts = ElevenLabsTTS()
+        # Not base_url, the client turns that into https on the default port
+        environment = ElevenLabsEnvironment(base=args.standin_url, wss=args.standin_url.replace("http", "ws", 1))
+        tts.client = AsyncElevenLabs(api_key="benchmark", environment=environment)
+        return tts, "benchmark-voice"
+    if engine == "pocket":
+        if args.pocket_voice:
+            tts = PocketTTS()
+            if tts.client:
+                return tts, args.pocket_voice
+        raise RuntimeError("Pocket TTS needs a configured model and --pocket-voice")
+    raise ValueError(f"Unknown engine {engine}")
+
+
+async def _measure(tts, voice_id: str, text: str) -> dict:
+    start = time.perf_counter()
+    first_chunk = None
+    audio_seconds = 0.0
+    total_bytes = 0
+    async for chunk, duration in tts.get_stream(text, voice_id):
+        if chunk is None:
+            raise RuntimeError("engine returned no audio")
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        audio_seconds += duration or 0
+        total_bytes += len(chunk)
+    total = time.perf_counter() - start
+    return {
+        "time_to_first_chunk": first_chunk,
+        "synthesis_time": total,
+        "audio_seconds": audio_seconds,
+        "real_time_factor": total / audio_seconds if audio_seconds else None,
+        "bytes": total_bytes,
+    }
+
+
+def run_engine(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="tcdnd-bench-")
+    _setup_app(workdir)
+    result = {"engine": args.child}
+
+    start = time.perf_counter()
+    try:
+        tts, voice_id = _create_engine(args.child, args)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["init_time"] = time.perf_counter() - start
+
+    async def _run_all():
+        runs = []
+        for label, text in CORPUS.items():
+            for i in range(args.repeat):
+                run = {"message": label, "chars": len(text), "run": i}
+                try:
+                    run.update(await _measure(tts, voice_id, text))
+                except Exception as e:
+                    run["error"] = str(e)
+                runs.append(run)
+        return runs
+
+    result["runs"] = asyncio.run(_run_all())
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    return result
+
+
+#### Parent ####
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the TTS engines.")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma separated engines to run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per corpus message.")
+    parser.add_argument("--pocket-voice", default=None, help="Voice file (.wav or .safetensors) for Pocket TTS.")
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout.")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--standin-url", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        result = run_engine(args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    server = start_standin_server()
+    standin_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "corpus": {label: len(text) for label, text in CORPUS.items()},
+        "engines": [],
+    }
+    try:
+        for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+            result_file = os.path.join(tempfile.mkdtemp(prefix="tcdnd-bench-"), "result.json")
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--child", engine, "--standin-url", standin_url, "--repeat", str(args.repeat),
+                "--result-file", result_file,
+            ]
+            if args.pocket_voice:
+                command += ["--pocket-voice", os.path.abspath(args.pocket_voice)]
+            print(f"Benchmarking {engine}...", file=sys.stderr)
+            proc = subprocess.run(command, capture_output=True, text=True, check=False)
+            try:
+                with open(result_file, encoding="utf-8") as f:
+                    results["engines"].append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                results["engines"].append({"engine": engine, "error": proc.stderr.strip()[-2000:] or "no result"})
+    finally:
+        server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 from helpers import Event
 
+on_voices_changed = Event()
+on_tts_ready = Event()
+
 on_elevenlabs_connect = Event()
 request_elevenlabs_connect = Event()
 on_elevenlabs_test_speak = Event()
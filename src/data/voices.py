@@ -51,6 +51,12 @@ class Voice(Base):
         return self.name > other.name
 
 
+def _notify_voices_changed(added: list[Voice] = None, removed: list[str] = None):
+    # Imported here, chatdnd imports the data package
+    from chatdnd.events.tts_events import on_voices_changed  # pylint: disable=import-outside-toplevel
+    on_voices_changed.trigger([added or [], removed or []])
+
+
 async def _upsert_voice(name: str, uid: str, source: TTS_SOURCE) -> Voice | None:
     async with async_session() as session:
         async with session.begin():
@@ -64,13 +70,16 @@ async def _upsert_voice(name: str, uid: str, source: TTS_SOURCE) -> Voice | None
                 # Create new voice
                 new_voice = Voice(name=name, uid=uid, source=source.value)
                 session.add(new_voice)
-                return new_voice
+        _notify_voices_changed(added=[new_voice])
+        return new_voice
 
 
 async def bulk_insert_voices(values: List[Tuple[str, str]], source: TTS_SOURCE):
     async with async_session() as session:
         async with session.begin():
-            session.add_all([Voice(name=v[0], uid=v[1], source=source.value) for v in values])
+            voices = [Voice(name=v[0], uid=v[1], source=source.value) for v in values]
+            session.add_all(voices)
+    _notify_voices_changed(added=voices)
 
 
 async def get_all_voice_ids(source: TTS_SOURCE) -> list:
@@ -91,6 +100,7 @@ async def delete_voice(uid: str | list = None, source: TTS_SOURCE = None) -> boo
             if voice:
                 await session.delete(voice)
                 await session.commit()
+                _notify_voices_changed(removed=[voice.uid])
                 return True
         elif isinstance(uid, list):
             query = select(Voice).where(Voice.uid.in_(uid))
@@ -99,6 +109,7 @@ async def delete_voice(uid: str | list = None, source: TTS_SOURCE = None) -> boo
             for voice in voices:
                 await session.delete(voice)
             await session.commit()
+            _notify_voices_changed(removed=[voice.uid for voice in voices])
             return True
         return False
 
@@ -118,7 +129,7 @@ async def fetch_voice(name: str = None, uid: str = None, source: TTS_SOURCE = No
         return result.scalars().first()
 
 
-async def fetch_voices(source: TTS_SOURCE = None, limit: int = 100) -> list[Voice]:
+async def fetch_voices(source: TTS_SOURCE = None, limit: int | None = 100) -> list[Voice]:
 
     async with async_session() as session:
         query = select(Voice)
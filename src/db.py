@@ -1,9 +1,12 @@
 import os
+import time
 import logging
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from custom_logger.logger import logger
+from helpers.metrics import DB_QUERY_SECONDS
 from data.base import Base
 
 DATABASE_URL = "sqlite+aiosqlite:///tcdnd_data.db"
@@ -16,6 +19,24 @@ logging.getLogger("sqlalchemy.engine").setLevel(logging.DEBUG if debug_mode else
 logging.getLogger("sqlalchemy.engine").handlers = logger.handlers
 
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERY_SECONDS.observe(time.perf_counter() - conn.info["query_start"].pop())
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _query_failed(exception_context):
+    # after_cursor_execute doesn't run for a statement that raises, its start time is dropped here
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
 async def initialize_database():
     # Initialize the database and create tables.#
     async with engine.begin() as conn:
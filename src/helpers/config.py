@@ -45,17 +45,34 @@ class TCDNDConfig(configparser.ConfigParser):
                 "join_user_cooldown": 30,
                 "help_global_cooldown": 30,
             },
-            "SERVER": {"port": "5000"},
+            "SERVER": {
+                "port": "5000",
+                "lookahead_depth": 1,
+                "lead_time_ms": 300,
+                "audio_codec": "pcm",  # opus needs PyAV, see requirements-opus.txt
+                "opus_bitrate": 32000,
+                "max_client_lag_ms": 5000,
+            },
             "CACHE": {
                 "enabled": "true",
                 "cache_expiry": 7 * 24 * 60 * 60,  # 1 week
                 "tts_cache_expiry": 7 * 24 * 60 * 60 * 4 * 3,  # 3 months
                 "pfp_cache_expiry": 7 * 24 * 60 * 60 * 2,  # 2 weeks
+                "utterance_cache_enabled": "true",
+                "utterance_cache_size_mb": 512,
+                "preview_cache_size_mb": 64,
+            },
+            "TTS": {
+                "segment_sentences": "true",
+                "segment_max_chars": 200,
+                "segment_lookahead": 1,
+                "normalize_loudness": "true",
+                "target_lufs": -16,
             },
             "DND": {"party_size": 4},
-            "ELEVENLABS": {"api_key": "", "usage_warning": 500},
-            "STREAMELEMENTS": {"boost_db": 6.2},
-            "POCKET_TTS": {"voices_dir": "voices", "model_path": ""},
+            "ELEVENLABS": {"api_key": "", "usage_warning": 500, "streaming": "true", "jitter_buffer_ms": 250, "usage_poll_interval": 300},
+            "STREAMELEMENTS": {"boost_db": 6.2, "max_concurrency": 4, "pcm_output": "true"},
+            "POCKET_TTS": {"voices_dir": "voices", "model_path": "", "workers": 0, "voice_cache_size": 16},  # workers: 0 = synthesize in-process
         }
 
         # Init config.ini file
@@ -7,6 +7,14 @@ from custom_logger.logger import logger
 _TASK_QUEUE = None
 
 
+def queue_on_main_loop(func, *args) -> bool:
+    """Have `func(*args)` called from the app's main loop. False if the app hasn't set up its task queue."""
+    if _TASK_QUEUE is None:
+        return False
+    _TASK_QUEUE.put((func, *args))
+    return True
+
+
 class Event:
     def __init__(self):
         self.__listeners = []
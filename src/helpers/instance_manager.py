@@ -31,6 +31,7 @@ def _cleanup():
 #### Cache #####
 
 _cache_registry = {}
+_cache_settings = {}
 _cache_store = {}
 
 @lru_cache(maxsize=None)
@@ -40,16 +41,18 @@ def get_cache(name='default') -> Cache:
         cache = _cache_store.get(name)
         return cache
     path = _cache_registry.get(name)
+    settings = _cache_settings.get(name, {})
     if path:
-        cache = Cache(directory=path)
+        cache = Cache(directory=path, **settings)
     else:
-        cache = Cache()
+        cache = Cache(**settings)
     _cache_store[name] = cache
     register_cleanup(cache)
     return cache
 
 
-def init_cache(name='default', path=None) -> Cache:
+def init_cache(name='default', path=None, **settings) -> Cache:
+    # Extra settings are passed to diskcache, ex: size_limit, eviction_policy
     if name in _cache_registry:
         return get_cache(name)
     if path is None:
@@ -57,6 +60,7 @@ def init_cache(name='default', path=None) -> Cache:
         return get_cache(name)
     Path(path).mkdir(parents=True, exist_ok=True)
     _cache_registry[name] = path
+    _cache_settings[name] = settings
     return get_cache(name)
 
 ################
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from functools import lru_cache
+
+import requests
+from PIL import Image, ImageOps, features
+
+from helpers.instance_manager import get_config
+from helpers.utils import try_get_cache
+from custom_logger.logger import logger
+
+# Profile pictures, downloaded once per url and kept as square thumbnails per size and format in the
+# default cache. Shared by the overlay's /pfp route and the desktop UI's member cards.
+
+MIN_SIZE = 16
+MAX_SIZE = 512
+FORMAT_WEBP = "webp"
+FORMAT_PNG = "png"
+CONTENT_TYPES = {FORMAT_WEBP: "image/webp", FORMAT_PNG: "image/png"}
+_DECODED_ENTRIES = 64
+
+
+class PfpThumbnail:
+    __slots__ = ("data", "etag", "fmt")
+
+    def __init__(self, data: bytes, etag: str, fmt: str):
+        self.data = data
+        self.etag = etag
+        self.fmt = fmt
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.fmt]
+
+
+class PfpStore:
+    """Downloads each profile picture once and serves resized variants of it."""
+
+    def __init__(self):
+        self._decoded: OrderedDict[tuple[str, int], Image.Image] = OrderedDict()
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clamp_size(size: int) -> int:
+        return max(MIN_SIZE, min(MAX_SIZE, size))
+
+    @staticmethod
+    def webp_supported() -> bool:
+        return features.check("webp")
+
+    @staticmethod
+    def _expiry() -> int:
+        config = get_config("default")
+        return config.getint(section="CACHE", option="pfp_cache_expiry", fallback=7 * 24 * 60 * 60 * 2)
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def original(self, url: str) -> bytes | None:
+        if not url:
+            return None
+        key = f"pfp.original.{url}"
+        cache = try_get_cache("default")
+        # One download per url, even when the overlay and the UI ask for it at the same time
+        with self._url_lock(url):
+            if cache is not None and (data := cache.get(key=key, default=None)):
+                return data
+            try:
+                response = requests.get(url, timeout=10)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Could not download profile picture {url}: {e}")
+                return None
+            data = response.content
+            if cache is not None:
+                cache.set(key=key, value=data, expire=self._expiry())
+            return data
+
+    def thumbnail(self, url: str, size: int, fmt: str = FORMAT_PNG) -> PfpThumbnail | None:
+        size = self.clamp_size(size)
+        if fmt == FORMAT_WEBP and not self.webp_supported():
+            fmt = FORMAT_PNG
+        key = f"pfp.thumb.{url}.{size}.{fmt}"
+        cache = try_get_cache("default")
+        if cache is not None and (cached := cache.get(key=key, default=None)):
+            return PfpThumbnail(*cached)
+
+        image = self.image(url, size)
+        if image is None:
+            return None
+        output = BytesIO()
+        if fmt == FORMAT_WEBP:
+            image.save(output, format="WEBP", quality=85, method=4)
+        else:
+            image.save(output, format="PNG", optimize=True)
+        data = output.getvalue()
+        etag = hashlib.sha1(data).hexdigest()[:16]
+        if cache is not None:
+            cache.set(key=key, value=(data, etag, fmt), expire=self._expiry())
+        return PfpThumbnail(data, etag, fmt)
+
+    def image(self, url: str, size: int) -> Image.Image | None:
+        """The picture center cropped to a `size` square, decoded once and kept in memory."""
+        size = self.clamp_size(size)
+        with self._lock:
+            if (url, size) in self._decoded:
+                self._decoded.move_to_end((url, size))
+                return self._decoded[(url, size)]
+
+        data = self.original(url)
+        if data is None:
+            return None
+        try:
+            with Image.open(BytesIO(data)) as source:
+                image = ImageOps.fit(source.convert("RGBA"), (size, size), Image.Resampling.LANCZOS)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not decode profile picture {url}: {e}")
+            return None
+
+        with self._lock:
+            self._decoded[(url, size)] = image
+            while len(self._decoded) > _DECODED_ENTRIES:
+                self._decoded.popitem(last=False)
+        return image
+
+
+@lru_cache(maxsize=None)
+def get_pfp_store() -> PfpStore:
+    return PfpStore()
@@ -61,6 +61,19 @@ def run_coroutine_sync(coroutine: Coroutine[Any, Any, T], timeout: float = 30) -
         return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
 
 
+def call_soon_in_loop(loop: asyncio.AbstractEventLoop | None, func, *args):
+    """Run a non-blocking `func(*args)` on `loop`. Directly when already on it (or it isn't known yet),
+    otherwise handed over thread safely, as asyncio queues and events may only be touched from their own loop."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is None or running is loop:
+        func(*args)
+    else:
+        loop.call_soon_threadsafe(func, *args)
+
+
 def check_for_updates():
     owner = "WolfwithSword"  # TODO consider moving to a metadata file?
     repo = "TwitchChatDND"
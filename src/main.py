@@ -2,61 +2,22 @@ import os
 import sys
 
 import asyncio
+import multiprocessing
 from queue import Queue
 from logging import getLogger
 
-from alembic.config import Config as AlembicConfig
-from alembic import command as alembic_command
+# Pocket TTS workers are spawned processes (see tts.pocket_worker) that re-import this file as __mp_main__.
+# Only the functions below are defined at import, the app's imports and setup run under __main__ so a
+# worker doesn't load the UI, config or database. In a frozen build freeze_support hands the worker to
+# its entry point before any of that.
 
-from initialize import _args as args # Also runs some initializing logic on import
-
-from helpers.instance_manager import init_cache, init_config
-from helpers.constants import TTS_SOURCE
-from tts import get_tts
-
-from twitch.utils import TwitchUtils
-from twitch.chat import ChatController
-
-import helpers.event as _event_module
-from helpers.utils import check_for_updates
-from ui.app import DesktopApp
-from server.app import ServerApp
-
-from chatdnd import SessionManager
-from chatdnd.events.ui_events import (
-    ui_settings_twitch_auth_update_event,
-    ui_on_startup_complete,
-    ui_fetch_update_check_event,
-)
-
-from db import initialize_database
-
-assert args is not None
 logger = getLogger("ChatDND")
 cwd = os.getcwd()
 
 _tasks = Queue()
 
-setattr(sys.modules[_event_module.__name__], "_TASK_QUEUE", _tasks)
-
-if getattr(sys, "frozen", False):
-    base_path = sys._MEIPASS
-    src_path = os.path.join(base_path, "src")
-    sys.path.insert(0, src_path)
-
-
-config_path = os.path.join(cwd, "config.ini")
-cache_dir = os.path.join(cwd, ".tcdnd-cache/")
-
-# Initialize config and cache
-config = init_config(name='default', path=config_path)
-
-if config.has_section('CACHE') and config.has_option(section="CACHE", option="directory"):
-    cache_dir = config.get(section='CACHE', option='directory')
-cache = init_cache(name='default', path=cache_dir)
+APP_RUNNING = True
 
-if not config.has_option(section="CACHE", option="directory"):
-    config.set(section="CACHE", option="directory", value=cache_dir)
 
 def run_migrations():
     logger.info("Running DB Migrations...")
@@ -79,22 +40,6 @@ async def run_db_init():
     await initialize_database()
 
 
-asyncio.run(run_db_init())  # "DB-Setup"
-
-# Initialize TTS Engines
-for source in TTS_SOURCE:
-    get_tts(source)
-
-twitch_utils = TwitchUtils()
-
-session_mgr: SessionManager = SessionManager()
-chat: ChatController = ChatController(session_mgr)
-
-server = ServerApp()
-
-APP_RUNNING = True
-
-
 async def run_twitch():
     async def try_setup():
         while not config.twitch_auth:
@@ -158,9 +103,6 @@ async def run_twitch_bot():
         chat.stop()
 
 
-logger.info("Starting")
-
-
 async def run_server():
     await server.run_task(host="0.0.0.0", port=config.getint(section="SERVER", option="port", fallback=5000))
 
@@ -228,7 +170,77 @@ async def run_all():
                 await task
             except asyncio.CancelledError:
                 logger.warning(f"{task.get_name()} task was cancelled")
+        # After the server task, nothing is synthesizing anymore
+        await close_tts_engines()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    from alembic.config import Config as AlembicConfig
+    from alembic import command as alembic_command
+
+    from initialize import _args as args # Also runs some initializing logic on import
+
+    from helpers.instance_manager import init_cache, init_config
+    from tts import init_tts_engines, close_tts_engines
+
+    from twitch.utils import TwitchUtils
+    from twitch.chat import ChatController
+
+    import helpers.event as _event_module
+    from helpers.utils import check_for_updates
+    from ui.app import DesktopApp
+    from server.app import ServerApp
+
+    from chatdnd import SessionManager
+    from chatdnd.events.ui_events import (
+        ui_settings_twitch_auth_update_event,
+        ui_on_startup_complete,
+        ui_fetch_update_check_event,
+    )
+
+    from db import initialize_database
+
+    assert args is not None
+
+    setattr(sys.modules[_event_module.__name__], "_TASK_QUEUE", _tasks)
+
+    if getattr(sys, "frozen", False):
+        base_path = sys._MEIPASS
+        src_path = os.path.join(base_path, "src")
+        sys.path.insert(0, src_path)
+
+    config_path = os.path.join(cwd, "config.ini")
+    cache_dir = os.path.join(cwd, ".tcdnd-cache/")
+
+    # Initialize config and cache
+    config = init_config(name='default', path=config_path)
+
+    if config.has_section('CACHE') and config.has_option(section="CACHE", option="directory"):
+        cache_dir = config.get(section='CACHE', option='directory')
+    cache = init_cache(name='default', path=cache_dir)
+    init_cache(
+        name='tts',
+        path=os.path.join(cache_dir, 'tts'),
+        size_limit=config.getint(section="CACHE", option="utterance_cache_size_mb", fallback=512) * 1024 * 1024,
+        eviction_policy='least-recently-used',
+    )
+
+    if not config.has_option(section="CACHE", option="directory"):
+        config.set(section="CACHE", option="directory", value=cache_dir)
+
+    asyncio.run(run_db_init())  # "DB-Setup"
+
+    # Initialize TTS Engines in the background, they're created on first use if not ready yet
+    init_tts_engines()
+
+    twitch_utils = TwitchUtils()
+
+    session_mgr: SessionManager = SessionManager()
+    chat: ChatController = ChatController(session_mgr)
+
+    server = ServerApp()
+
+    logger.info("Starting")
     asyncio.run(run_all())
@@ -0,0 +1,65 @@
+import sys
+import logging
+from multiprocessing.connection import Connection
+
+import numpy as np
+import pocket_tts_bindings
+
+# Entry point of the Pocket TTS worker processes (see tts.pocket_worker).
+# Kept outside the app's packages, and free of app imports, so a spawned worker only loads the model:
+# no config, cache, ffmpeg setup, or the app's log file, which the main process keeps for itself.
+# Failures are reported back over the connection and logged by the main process.
+
+MODEL_KWARGS = {"device": "cpu", "temp": 0.8, "lsd_decode_steps": 5, "eos_threshold": -3.5, "noise_clamp": 1.0}
+
+logger = logging.getLogger("ChatDND.PocketWorker")
+
+
+def load_model(model_path: str) -> pocket_tts_bindings.PyTTSModel:
+    return pocket_tts_bindings.PyTTSModel.load_from_paths(model_path, **MODEL_KWARGS)
+
+
+def _setup_logging(debug: bool):
+    # Windowed builds have no stderr, the worker stays silent there
+    if debug and sys.stderr is not None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(processName)s] [%(levelname)s] - %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+
+def run_worker(conn: Connection, debug: bool = False):
+    _setup_logging(debug)
+    model = None
+    try:
+        while True:
+            message = conn.recv()
+            command = message[0]
+            if command == "stop":
+                break
+            if command == "load":
+                try:
+                    model = load_model(message[1])
+                    conn.send(("ready", None))
+                    logger.debug("Model loaded")
+                except Exception as e:
+                    conn.send(("error", str(e)))
+            elif command in ("generate", "generate_chunked"):
+                _, text, voice_id = message
+                try:
+                    if command == "generate_chunked":
+                        for frame in model.generate_chunked(text, voice_id):
+                            conn.send(("frame", np.asarray(frame, dtype=np.float32).tobytes()))
+                    else:
+                        conn.send(("frame", np.asarray(model.generate(text, voice_id), dtype=np.float32).tobytes()))
+                    conn.send(("done", None))
+                except Exception as e:
+                    logger.debug(f"Generation failed: {e}")
+                    conn.send(("error", str(e)))
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
@@ -1,14 +1,27 @@
+import json
 import asyncio
+import hashlib
+import itertools
 from asyncio import Queue
+from urllib.parse import quote
 
-from functools import wraps
-from quart import Quart, websocket, send_from_directory
+from quart import Quart, Response, request, websocket, send_from_directory
 
 from data import Member
-from data.voices import fetch_voice
-from helpers.utils import get_resource_path
-from helpers.constants import TTS_SOURCE
-from tts import get_tts
+from data.member import fetch_member
+from helpers.utils import get_resource_path, call_soon_in_loop
+from helpers.instance_manager import get_config
+from helpers.metrics import REGISTRY, WEBSOCKET_SENT_BYTES, monitor_event_loop
+from helpers.pfp_store import get_pfp_store, FORMAT_PNG, FORMAT_WEBP
+from server.hub import BroadcastHub
+from server.fanout import AudioClient, SEND_TIMEOUT
+from server.pacing import PacingController
+from server.pipeline import SynthesisPipeline, PreparedSpeech
+from server.replay import UtteranceReplay
+from server.protocol import UtteranceEncoder, CODEC_PCM, CODEC_OPUS
+from server.opus import OpusUtteranceEncoder, opus_available
+from tts.utterance_cache import get_utterance_cache
+from tts.preview_store import get_preview_store
 from custom_logger.logger import logger
 
 from chatdnd.events.chat_events import chat_say_command
@@ -17,44 +30,55 @@ from chatdnd.events.web_events import on_overlay_open
 
 
 STATIC_DIR = get_resource_path("../server/static", from_resources=True)
+OVERLAY_PFP_SIZE = 260
+PFP_MAX_AGE = 365 * 24 * 60 * 60
 message_queue = Queue()
-members_queue = Queue()
-clients = set()
-overlay_clients = set()
+member_updates = BroadcastHub("members")
+clients: set[AudioClient] = set()
+clients_connected = asyncio.Event()
 
 
-def collect_tts_websockets(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        clients.add(websocket._get_current_object())
-        try:
-            return await func(*args, **kwargs)
-        finally:
-            clients.discard(websocket._get_current_object())
-
-    return wrapper
+def broadcast_tts(frames: dict[str, list[bytes]], duration: float = 0.0):
+    # Frames are encoded once per codec, each client gets the ones for the codec it negotiated
+    for client in clients:
+        client.push(frames.get(client.codec, []), duration)
 
 
-def collect_member_websockets(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        overlay_clients.add(websocket._get_current_object())
-        try:
-            return await func(*args, **kwargs)
-        finally:
-            overlay_clients.discard(websocket._get_current_object())
+def _cache_requests() -> dict:
+    stats = {}
+    caches = {"utterance": get_utterance_cache(), "preview": get_preview_store()}
+    for name, cache in caches.items():
+        if cache is not None:
+            stats[(name, "hit")] = cache.hits
+            stats[(name, "miss")] = cache.misses
+    return stats
 
-    return wrapper
 
+REGISTRY.gauge(
+    "tcdnd_queue_depth",
+    "Messages waiting in a server queue. For members, the backlog of the slowest overlay.",
+    ("queue",),
+    function=lambda: {("messages",): message_queue.qsize(), ("members",): member_updates.backlog()},
+)
+REGISTRY.gauge(
+    "tcdnd_websocket_clients",
+    "Connected overlay websockets.",
+    ("ws",),
+    function=lambda: {("tts",): len(clients), ("members",): len(member_updates)},
+)
+REGISTRY.gauge(
+    "tcdnd_tts_client_behind_seconds",
+    "Unsent audio buffered for the slowest tts websocket.",
+    function=lambda: max((client.behind for client in clients), default=0.0),
+)
+REGISTRY.counter(
+    "tcdnd_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"), function=_cache_requests
+)
 
-async def broadcast_tts(chunk):
-    for websock in clients:
-        await asyncio.wait_for(websock.send(chunk), timeout=10)
 
-
-async def broadcast_member_update(message):
-    for websock in overlay_clients:
-        await asyncio.wait_for(websock.send_json(message), timeout=5)
+def publish_member_update(message):
+    logger.info(f"member msg {message}")
+    member_updates.publish(message)
 
 
 class ServerApp:
@@ -63,6 +87,24 @@ class ServerApp:
         self._setup_routes()
 
         self._party: set[Member] = set()
+        # What a newly opened overlay needs to catch up: the party cards and who is speaking
+        self._members_snapshot: dict = None
+        self._speaking: list[dict] = []
+        self._replay: UtteranceReplay = None
+
+        config = get_config(name="default")
+        self.pipeline = SynthesisPipeline(
+            message_queue, depth=config.getint(section="SERVER", option="lookahead_depth", fallback=1)
+        )
+        self._utterance_ids = itertools.count(1)
+        self.pacing = PacingController(
+            lead_time=config.getint(section="SERVER", option="lead_time_ms", fallback=300) / 1000
+        )
+        self.audio_codec = config.get(section="SERVER", option="audio_codec", fallback=CODEC_PCM).lower()
+        self.opus_bitrate = config.getint(section="SERVER", option="opus_bitrate", fallback=32000)
+        self.max_client_lag = config.getint(section="SERVER", option="max_client_lag_ms", fallback=5000) / 1000
+        self._speaker: asyncio.Task = None
+        self._loop: asyncio.AbstractEventLoop = None
 
         # Setup here temporarily for POC - or just keep tbh
         chat_say_command.addListener(self.chat_say)
@@ -72,102 +114,203 @@ class ServerApp:
     def _setup_routes(self):
 
         @self.app.websocket("/ws/tts")
-        @collect_tts_websockets
         async def audio_stream():
+            client = None
             try:
                 logger.debug("tts ws opened")
                 await websocket.send_json({"type": "heartbeat"})
-                while True:
-                    if not message_queue.empty():
-                        member, message = await message_queue.get()
-                        speech_message = {
-                            "type": "speech",
-                            "name": member.name,
-                            "message": message,
-                        }
-                        logger.info(f"saying '{message}' from {member}")
-                        duration = 0
-                        last_chunk_duration = 0
-                        send_bounce = False
-
-                        tts_type = TTS_SOURCE.SOURCE_LOCAL
-                        voice_id = ""
-                        if member and member.preferred_tts_uid:
-                            _voice = await fetch_voice(uid=member.preferred_tts_uid)
-                            if _voice:
-                                voice_id = member.preferred_tts_uid
-                                tts_type = TTS_SOURCE(_voice.source)
-                        tts = get_tts(tts_type)
-                        if not tts:
-                            continue
-                        async for chunk, _duration in tts.get_stream(message, voice_id):
-                            # TODO: Allow for break / interruption from emergency stuff - also hide stuff.
-                            # Or yknow, just instruct to hide the browser source.
-                            # Yeah, to mute, best to just hide the browser source.
-                            if not send_bounce:
-                                send_bounce = True
-                                await self.animate_member(member.name, "bounce")
-                                await members_queue.put(speech_message)
-                            await broadcast_tts(chunk)
-                            duration += _duration
-                            last_chunk_duration = _duration
-                        await asyncio.sleep(last_chunk_duration)
-                        speech_message = {"type": "endspeech"}
-                        await self.animate_member(member.name, "idle")
-                        await asyncio.sleep(0.2)
-
-                        await members_queue.put(speech_message)
-
-                    await asyncio.sleep(0.1)
+                codec = await self.negotiate_codec()
+                client = AudioClient(websocket._get_current_object(), codec, max_behind=self.max_client_lag)
+                if self._replay:
+                    frames, remaining = self._replay.resume(codec)
+                    client.push(frames, remaining)
+                    self.pacing.sent([client], remaining)
+                    logger.debug(f"tts ws resuming utterance {self._replay.utterance_id} with {remaining:.1f}s left")
+                clients.add(client)
+                clients_connected.set()
+                self.start_speaker()
+                await client.run()
+            except asyncio.TimeoutError:
+                logger.warning(f"tts ws stalled for over {SEND_TIMEOUT}s, dropping it")
             except Exception as e:
                 logger.error(e)
             finally:
+                if client:
+                    clients.discard(client)
+                    self.pacing.remove(client)
+                if not clients:
+                    clients_connected.clear()
                 logger.debug("tts ws closed")
 
         @self.app.websocket("/ws/members")
-        @collect_member_websockets
         async def user_overlay_ws():
-            try:
-                await websocket.send_json({"type": "heartbeat"})
-                logger.debug("overlay ws opened")
-                await asyncio.sleep(0.3)
-                on_overlay_open.trigger()
-                await asyncio.sleep(0.3)
-                while True:
-                    while not members_queue.empty():
-                        message = await members_queue.get()
-                        logger.info(f"member msg {message}")
-                        await broadcast_member_update(message)
-                        await asyncio.sleep(0.05)
-                    await asyncio.sleep(0.5)
-            finally:
-                logger.debug("overlay ws closed")
+            with member_updates.subscribe() as updates:
+                try:
+                    await websocket.send_json({"type": "heartbeat"})
+                    logger.debug("overlay ws opened")
+                    if self._members_snapshot is None:
+                        # Nothing published yet, ask the session for the party
+                        on_overlay_open.trigger()
+                    else:
+                        for message in [self._members_snapshot, *self._speaking]:
+                            await self.send_member_update(message)
+                    while True:
+                        message = await updates.get()
+                        await self.send_member_update(message)
+                finally:
+                    logger.debug("overlay ws closed")
 
         @self.app.route("/overlay")
         async def overlay():
             return await send_from_directory(STATIC_DIR, "overlay.html")
 
-    async def chat_say(self, member: Member, text: str):
-        await message_queue.put((member, text))
+        @self.app.route("/pfp/<name>/<int:size>")
+        async def pfp(name: str, size: int):
+            member = next((m for m in self._party if m.name.lower() == name.lower()), None)
+            if member is None:
+                member = await fetch_member(name=name)
+            if member is None or not member.pfp_url:
+                return Response("Unknown member", status=404)
+
+            store = get_pfp_store()
+            fmt = FORMAT_WEBP if "image/webp" in request.headers.get("Accept", "") else FORMAT_PNG
+            thumbnail = await asyncio.to_thread(store.thumbnail, member.pfp_url, size, fmt)
+            if thumbnail is None:
+                return Response("Could not fetch profile picture", status=502)
+
+            headers = {
+                "ETag": f'"{thumbnail.etag}"',
+                # The overlay's urls carry a version of the pfp url, so they never go stale
+                "Cache-Control": f"public, max-age={PFP_MAX_AGE}, immutable",
+                "Vary": "Accept",
+            }
+            if request.if_none_match.contains_weak(thumbnail.etag):
+                return Response("", status=304, headers=headers)
+            return Response(thumbnail.data, content_type=thumbnail.content_type, headers=headers)
+
+        @self.app.route("/metrics")
+        async def metrics():
+            return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @staticmethod
+    async def send_member_update(message: dict):
+        data = json.dumps(message)
+        await asyncio.wait_for(websocket.send(data), timeout=5)
+        WEBSOCKET_SENT_BYTES.inc(len(data.encode("utf-8")), ws="members")
+
+    async def negotiate_codec(self) -> str:
+        """Pick the audio codec for the connecting overlay from the ones it offers in its hello."""
+        try:
+            hello = await asyncio.wait_for(websocket.receive_json(), timeout=2)
+        except (asyncio.TimeoutError, ValueError):
+            return CODEC_PCM
+        offered = hello.get("codecs", []) if isinstance(hello, dict) else []
+
+        codec = CODEC_PCM
+        if self.audio_codec == CODEC_OPUS and CODEC_OPUS in offered:
+            if opus_available():
+                codec = CODEC_OPUS
+            else:
+                logger.warning("Opus audio is enabled but PyAV is not installed, sending PCM")
+        await websocket.send_json({"type": "codec", "codec": codec})
+        logger.debug(f"tts ws using {codec} audio")
+        return codec
+
+    def start_speaker(self):
+        if self._speaker is None or self._speaker.done():
+            self._speaker = asyncio.create_task(self._speak_forever(), name="TTS-Speaker")
+
+    async def _speak_forever(self):
+        # The only consumer of the pipeline, every message is synthesized once whatever the number of overlays
+        while True:
+            await clients_connected.wait()
+            speech = await self.pipeline.next()
+            try:
+                await self.speak(speech)
+            except Exception as e:
+                logger.error(e)
+            finally:
+                self.pipeline.done(speech)
+
+    async def speak(self, speech: PreparedSpeech):
+        member, message = speech.member, speech.message
+        speech_message = {
+            "type": "speech",
+            "name": member.name,
+            "message": message,
+        }
+        logger.info(f"saying '{message}' from {member}")
+        send_bounce = False
+        replay = UtteranceReplay(next(self._utterance_ids), self.make_encoder)
+
+        try:
+            async for chunk, _duration in speech.chunks():
+                # TODO: Allow for break / interruption from emergency stuff - also hide stuff.
+                # Or yknow, just instruct to hide the browser source.
+                # Yeah, to mute, best to just hide the browser source.
+                if not send_bounce:
+                    send_bounce = True
+                    self._replay = replay
+                    self.animate_member(member.name, "bounce")
+                    publish_member_update(speech_message)
+                    self._speaking = [{"type": "animate", "name": member.name, "animation": "bounce"}, speech_message]
+                await self.pacing.wait(clients)
+                broadcast_tts(replay.encode({client.codec for client in clients}, chunk, _duration), _duration)
+                self.pacing.sent(clients, _duration)
+            if not send_bounce:
+                return
+            broadcast_tts(replay.encode({client.codec for client in clients}))
+            await self.pacing.drain(clients)
+        finally:
+            self._replay = None
+            self._speaking = []
+        speech_message = {"type": "endspeech"}
+        self.animate_member(member.name, "idle")
+        await asyncio.sleep(0.2)
+
+        publish_member_update(speech_message)
+
+    def make_encoder(self, codec: str, utterance_id: int) -> UtteranceEncoder:
+        if codec == CODEC_OPUS:
+            return OpusUtteranceEncoder(utterance_id, bitrate=self.opus_bitrate)
+        return UtteranceEncoder(utterance_id)
+
+    def chat_say(self, member: Member, text: str):
+        # Triggered from the twitch chat thread, the queue is awaited by the pipeline on the server's loop
+        call_soon_in_loop(self._loop, message_queue.put_nowait, (member, text))
 
     async def run_task(self, host="0.0.0.0", port:int = 5000, **kwargs):
         # TODO on port change, request app restart
-        await self.app.run_task(
-            host=host,
-            port=port,
-            **kwargs,
-        )
+        self._loop = asyncio.get_running_loop()
+        loop_monitor = asyncio.create_task(monitor_event_loop(), name="Loop-Monitor")
+        try:
+            await self.app.run_task(
+                host=host,
+                port=port,
+                **kwargs,
+            )
+        finally:
+            loop_monitor.cancel()
 
     async def send_members(self, members: list[Member] = None):
         if members is None:
             members = []
-        user_data = [{"name": member.name, "pfp_url": member.pfp_url} for member in sorted(members)]
+        self._party = set(members)
+        user_data = [
+            {"name": member.name, "pfp_url": member.pfp_url, "pfp": self.pfp_path(member)} for member in sorted(members)
+        ]
         if not user_data:
             speech_message = {"type": "endspeech"}
-            await members_queue.put(speech_message)
+            publish_member_update(speech_message)
         message = {"type": "update_users", "users": user_data}
-        await members_queue.put(message)
+        self._members_snapshot = message
+        publish_member_update(message)
+
+    @staticmethod
+    def pfp_path(member: Member, size: int = OVERLAY_PFP_SIZE) -> str:
+        version = hashlib.sha1(member.pfp_url.encode("utf-8")).hexdigest()[:8] if member.pfp_url else "0"
+        return f"/pfp/{quote(member.name, safe='')}/{size}?v={version}"
 
-    async def animate_member(self, name, anim_type):
+    def animate_member(self, name, anim_type):
         message = {"type": "animate", "name": name, "animation": anim_type}
-        await members_queue.put(message)
+        publish_member_update(message)
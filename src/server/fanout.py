@@ -0,0 +1,65 @@
+import asyncio
+from collections import deque
+
+from helpers.metrics import WEBSOCKET_SENT_BYTES
+from server.protocol import FRAME_FORMAT, FRAME_END
+from custom_logger.logger import logger
+
+SEND_TIMEOUT = 10
+_CONTROL_FRAMES = (FRAME_FORMAT, FRAME_END)
+
+
+class AudioClient:
+    """One /ws/tts connection with its own send buffer.
+
+    The speaker pushes frames without waiting and the connection's task sends them, so a slow client never
+    holds up synthesis or the other clients. When more than `max_behind` seconds of audio are still waiting
+    as a new chunk arrives, the client skips ahead to the new chunk. A send that stalls for SEND_TIMEOUT
+    drops the client.
+    """
+
+    def __init__(self, websocket, codec: str, max_behind: float = 5.0):
+        self.websocket = websocket
+        self.codec = codec
+        self.max_behind = max_behind
+        self._pending: deque[tuple[list[bytes], float]] = deque()
+        self._pending_seconds = 0.0
+        self._ready = asyncio.Event()
+
+    @property
+    def behind(self) -> float:
+        """Seconds of audio buffered here that haven't been sent yet."""
+        return self._pending_seconds
+
+    def push(self, frames: list[bytes], duration: float = 0.0):
+        if not frames:
+            return
+        duration = duration or 0.0
+        # Only the backlog counts, a single chunk can be longer than max_behind (~6s at max_chunk_size)
+        if self._pending_seconds > self.max_behind:
+            self._skip_ahead()
+        self._pending.append((frames, duration))
+        self._pending_seconds += duration
+        self._ready.set()
+
+    def _skip_ahead(self):
+        # Drop the buffered audio, but keep format changes and utterance ends so the overlay stays in sync
+        skipped = self._pending_seconds
+        kept = [frame for frames, _ in self._pending for frame in frames if frame[1] in _CONTROL_FRAMES]
+        self._pending.clear()
+        self._pending_seconds = 0.0
+        if kept:
+            self._pending.append((kept, 0.0))
+        logger.warning(f"tts client fell {skipped:.1f}s behind, skipped ahead")
+
+    async def run(self):
+        """Send buffered frames until the connection closes or stalls."""
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                frames, duration = self._pending.popleft()
+                self._pending_seconds -= duration
+                for frame in frames:
+                    await asyncio.wait_for(self.websocket.send(frame), timeout=SEND_TIMEOUT)
+                    WEBSOCKET_SENT_BYTES.inc(len(frame), ws="tts")
+            self._ready.clear()
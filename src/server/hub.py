@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import contextmanager
+
+from helpers.utils import call_soon_in_loop
+from custom_logger.logger import logger
+
+
+class BroadcastHub:
+    """Fans each published message out to every subscriber.
+
+    Producers publish once without waiting on anyone, from any thread. Every subscriber awaits its own
+    bounded queue. A subscriber that falls `maxsize` messages behind loses its oldest message instead of
+    holding up the producer or the other subscribers.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256):
+        self.name = name
+        self.maxsize = maxsize
+        self._subscribers: set[asyncio.Queue] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def backlog(self) -> int:
+        """Messages waiting for the subscriber that is furthest behind."""
+        return max((queue.qsize() for queue in self._subscribers), default=0)
+
+    def publish(self, message):
+        if self._loop is None:
+            return
+        # Events can fire from the UI thread or a throwaway loop, the queues belong to the server's loop
+        call_soon_in_loop(self._loop, self._deliver, message)
+
+    def _deliver(self, message):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                logger.warning(f"{self.name} subscriber is falling behind, dropped its oldest message")
+            queue.put_nowait(message)
+
+    @contextmanager
+    def subscribe(self):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
@@ -0,0 +1,95 @@
+import numpy as np
+
+from server.protocol import UtteranceEncoder, FRAME_FORMAT, FRAME_OPUS, FORMAT_PAYLOAD
+from custom_logger.logger import logger
+
+try:
+    import av
+except ImportError:
+    av = None
+
+OPUS_SAMPLE_RATE = 48000
+OPUS_FRAME_SIZE = 960  # 20ms
+
+
+def opus_available() -> bool:
+    return av is not None
+
+
+class OpusUtteranceEncoder(UtteranceEncoder):
+    """Compresses the PCM of one utterance to Opus packets, one per OPUS frame.
+
+    The overlay decodes the packets with WebCodecs. Encoded chunks from the engines (mp3) are passed
+    through as ENCODED frames, and anything that isn't 16-bit PCM is sent uncompressed.
+    """
+
+    def __init__(self, utterance_id: int, bitrate: int = 32000):
+        super().__init__(utterance_id)
+        self.bitrate = bitrate
+        self._codec = None
+        self._resampler = None
+        self._input_format: tuple[int, int, int] = None
+        self._opus_format: tuple[int, int, int] = None
+
+    def _open(self, channels: int):
+        self._codec = av.CodecContext.create("libopus", "w")
+        self._codec.sample_rate = OPUS_SAMPLE_RATE
+        self._codec.layout = "mono" if channels == 1 else "stereo"
+        self._codec.format = "s16"
+        self._codec.bit_rate = self.bitrate
+        self._codec.options = {"application": "voip", "frame_duration": "20"}
+        self._opus_format = (OPUS_SAMPLE_RATE, min(channels, 2), 16)
+
+    def _packets(self, frames) -> list[bytes]:
+        out = []
+        for frame in frames:
+            for packet in self._codec.encode(frame):
+                out.append(self._frame(FRAME_OPUS, bytes(packet)))
+        return out
+
+    def _flush_resampler(self) -> list[bytes]:
+        if self._resampler is None:
+            return []
+        frames = self._packets(self._resampler.resample(None))
+        self._resampler = None
+        return frames
+
+    def encode_pcm(self, pcm: bytes, wav_format: tuple[int, int, int]) -> list[bytes]:
+        sample_rate, channels, bits_per_sample = wav_format
+        if bits_per_sample != 16 or channels > 2:
+            return super().encode_pcm(pcm, wav_format)
+
+        frames = []
+        if self._codec is None:
+            self._open(channels)
+        if self.format != self._opus_format:
+            # First packet, or the last chunk went out uncompressed in its own format
+            self.format = self._opus_format
+            frames.append(self._frame(FRAME_FORMAT, FORMAT_PAYLOAD.pack(*self.format)))
+        if wav_format != self._input_format:
+            frames.extend(self._flush_resampler())
+            self._input_format = wav_format
+            self._resampler = av.AudioResampler(
+                format="s16", layout=self._codec.layout.name, rate=OPUS_SAMPLE_RATE, frame_size=OPUS_FRAME_SIZE
+            )
+
+        samples = np.frombuffer(pcm, dtype="<i2")
+        samples = samples[: len(samples) - len(samples) % channels]
+        if not len(samples):
+            return frames
+        frame = av.AudioFrame.from_ndarray(
+            samples.reshape(1, -1), format="s16", layout="mono" if channels == 1 else "stereo"
+        )
+        frame.sample_rate = sample_rate
+        frames.extend(self._packets(self._resampler.resample(frame)))
+        return frames
+
+    def end(self) -> list[bytes]:
+        frames = []
+        if self._codec is not None:
+            try:
+                frames.extend(self._flush_resampler())
+                frames.extend(self._packets([None]))
+            except Exception as e:
+                logger.error(f"Could not flush opus encoder: {e}")
+        return frames + super().end()
@@ -0,0 +1,61 @@
+import time
+import asyncio
+
+
+class PlaybackClock:
+    """Estimates how much audio a client has buffered from what was sent to it and a monotonic clock."""
+
+    def __init__(self):
+        self.start: float = None
+        self.sent = 0.0
+
+    def lead(self, now: float) -> float:
+        if self.start is None:
+            return 0.0
+        return max(0.0, self.sent - (now - self.start))
+
+    def add(self, duration: float, now: float):
+        if self.start is None or self.lead(now) <= 0:
+            # Idle or underrun, playback restarts as soon as this audio arrives
+            self.start = now
+            self.sent = 0.0
+        self.sent += duration
+
+
+class PacingController:
+    """Keeps every client `lead_time` seconds of audio ahead of its playback position.
+
+    Chunks are released as soon as the client that is furthest behind drops under the lead, instead of
+    sleeping a fixed duration per chunk, so nobody runs dry between chunks.
+    """
+
+    def __init__(self, lead_time: float = 0.3):
+        self.lead_time = max(0.0, lead_time)
+        self._clocks: dict = {}
+
+    def _clock(self, client) -> PlaybackClock:
+        if client not in self._clocks:
+            self._clocks[client] = PlaybackClock()
+        return self._clocks[client]
+
+    def remove(self, client):
+        self._clocks.pop(client, None)
+
+    def lead(self, clients) -> float:
+        now = time.monotonic()
+        return min((self._clock(client).lead(now) for client in clients), default=0.0)
+
+    async def wait(self, clients):
+        """Wait until some client has no more than `lead_time` of audio left to play."""
+        await asyncio.sleep(max(0.0, self.lead(clients) - self.lead_time))
+
+    def sent(self, clients, duration: float):
+        now = time.monotonic()
+        for client in clients:
+            self._clock(client).add(duration or 0, now)
+
+    async def drain(self, clients):
+        """Wait until every client has played everything it was sent."""
+        now = time.monotonic()
+        remaining = max((self._clock(client).lead(now) for client in clients), default=0.0)
+        await asyncio.sleep(remaining)
@@ -0,0 +1,90 @@
+import time
+import asyncio
+from asyncio import Queue
+
+from data import Member
+from helpers.constants import TTS_SOURCE
+from helpers.metrics import SYNTHESIS_SECONDS, FIRST_CHUNK_SECONDS
+from tts import wait_for_tts
+from tts.voice_catalog import get_voice_catalog
+from custom_logger.logger import logger
+
+
+class PreparedSpeech:
+    """A queued chat message whose audio is synthesized in the background, buffered in order."""
+
+    def __init__(self, member: Member, message: str):
+        self.member = member
+        self.message = message
+        self._chunks: Queue = Queue()
+        self.task: asyncio.Task = None
+
+    async def synthesize(self):
+        try:
+            tts_type = TTS_SOURCE.SOURCE_LOCAL
+            voice_id = ""
+            if self.member and self.member.preferred_tts_uid:
+                # From the in-memory catalog, not a DB query per message. Off the loop, the first call loads it
+                _voice = await asyncio.to_thread(get_voice_catalog().get, self.member.preferred_tts_uid)
+                if _voice:
+                    voice_id = self.member.preferred_tts_uid
+                    tts_type = TTS_SOURCE(_voice.source)
+            tts = await wait_for_tts(tts_type)
+            if not tts:
+                return
+            start = time.perf_counter()
+            first_chunk = True
+            async for chunk, duration in tts.stream_segments(self.message, voice_id):
+                if chunk is not None:
+                    if first_chunk:
+                        first_chunk = False
+                        FIRST_CHUNK_SECONDS.observe(time.perf_counter() - start, source=tts_type.value)
+                    await self._chunks.put((chunk, duration))
+            SYNTHESIS_SECONDS.observe(time.perf_counter() - start, source=tts_type.value)
+        except Exception as e:
+            logger.error(f"Synthesis failed for '{self.message}' from {self.member}: {e}")
+        finally:
+            await self._chunks.put(None)
+
+    async def chunks(self):
+        # Yielded as soon as they're synthesized, the server's pacing controller decides when they're sent
+        while True:
+            item = await self._chunks.get()
+            if item is None:
+                return
+            yield item
+
+
+class SynthesisPipeline:
+    """Starts synthesizing upcoming messages while the current one is still playing.
+
+    `depth` is how many messages may be synthesized ahead of the one being played.
+    """
+
+    def __init__(self, source: Queue, depth: int = 1):
+        self.source = source
+        self.depth = max(0, depth)
+        self._ready: Queue = Queue()
+        self._slots = asyncio.Semaphore(self.depth + 1)
+        self._task: asyncio.Task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="TTS-Pipeline")
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            member, message = await self.source.get()
+            speech = PreparedSpeech(member, message)
+            speech.task = asyncio.create_task(speech.synthesize())
+            await self._ready.put(speech)
+
+    async def next(self) -> PreparedSpeech:
+        self.start()
+        return await self._ready.get()
+
+    def done(self, speech: PreparedSpeech):
+        if speech.task and not speech.task.done():
+            speech.task.cancel()
+        self._slots.release()
@@ -0,0 +1,62 @@
+import struct
+
+from tts.pcm import parse_wav_header, WAV_HEADER_SIZE
+
+# Binary framing for audio sent over /ws/tts, mirrored in overlay.html
+#
+# Every frame starts with a 12 byte little-endian header:
+#   version (u8), frame type (u8), reserved (u16), utterance id (u32), sequence number (u32)
+# followed by the payload for that frame type:
+#   FORMAT  - sample rate (u32), channels (u16), bits per sample (u16). Sent once per utterance, or on change
+#   PCM     - raw little-endian PCM in the last sent format
+#   ENCODED - a complete compressed audio file (ex: mp3) for the overlay to decode itself
+#   END     - no payload, the utterance is finished
+#   OPUS    - one Opus packet, decoded to the last sent format. Only sent to clients that negotiated opus
+#
+# On connect the overlay sends {"type": "hello", "codecs": [...]} and the server answers with
+# {"type": "codec", "codec": ...}. Clients that don't say hello get PCM.
+
+PROTOCOL_VERSION = 1
+
+FRAME_FORMAT = 0
+FRAME_PCM = 1
+FRAME_ENCODED = 2
+FRAME_END = 3
+FRAME_OPUS = 4
+
+CODEC_PCM = "pcm"
+CODEC_OPUS = "opus"
+
+FRAME_HEADER = struct.Struct("<BBHII")
+FORMAT_PAYLOAD = struct.Struct("<IHH")
+
+
+class UtteranceEncoder:
+    """Turns the chunks of one utterance from a TTS engine into protocol frames."""
+
+    def __init__(self, utterance_id: int):
+        self.utterance_id = utterance_id & 0xFFFFFFFF
+        self.seq = 0
+        self.format: tuple[int, int, int] = None
+
+    def _frame(self, frame_type: int, payload: bytes = b"") -> bytes:
+        frame = FRAME_HEADER.pack(PROTOCOL_VERSION, frame_type, 0, self.utterance_id, self.seq) + payload
+        self.seq += 1
+        return frame
+
+    def encode(self, chunk: bytes) -> list[bytes]:
+        wav_format = parse_wav_header(chunk)
+        if wav_format is None:
+            return [self._frame(FRAME_ENCODED, chunk)]
+        return self.encode_pcm(chunk[WAV_HEADER_SIZE:], wav_format)
+
+    def encode_pcm(self, pcm: bytes, wav_format: tuple[int, int, int]) -> list[bytes]:
+        frames = []
+        if wav_format != self.format:
+            self.format = wav_format
+            frames.append(self._frame(FRAME_FORMAT, FORMAT_PAYLOAD.pack(*wav_format)))
+        frames.append(self._frame(FRAME_PCM, pcm))
+        return frames
+
+    def end(self) -> list[bytes]:
+        return [self._frame(FRAME_END)]
@@ -0,0 +1,102 @@
+import time
+from typing import Callable
+
+from server.pacing import PlaybackClock
+from server.protocol import UtteranceEncoder, FRAME_HEADER, FORMAT_PAYLOAD, FRAME_FORMAT, FRAME_PCM, FRAME_OPUS
+from server.opus import OPUS_FRAME_SIZE, OPUS_SAMPLE_RATE
+
+OPUS_FRAME_SECONDS = OPUS_FRAME_SIZE / OPUS_SAMPLE_RATE
+
+
+def trim_frames(frames: list[bytes], seconds: float, wav_format: tuple[int, int, int] | None) -> tuple[list[bytes], float]:
+    """Drop the first `seconds` of audio from a chunk's frames. PCM is cut to the sample, opus to the packet.
+    Encoded (mp3) frames can't be cut and are kept whole. Returns the frames and the seconds dropped."""
+    out = []
+    dropped = 0.0
+    for frame in frames:
+        frame_type = frame[1]
+        payload = frame[FRAME_HEADER.size :]
+        if frame_type == FRAME_FORMAT:
+            wav_format = FORMAT_PAYLOAD.unpack(payload)
+        elif dropped < seconds and frame_type == FRAME_PCM and wav_format:
+            sample_rate, channels, bits_per_sample = wav_format
+            block_align = channels * (bits_per_sample // 8)
+            skip = min(len(payload) // block_align, int((seconds - dropped) * sample_rate)) * block_align
+            dropped += skip / (sample_rate * block_align)
+            if skip < len(payload):
+                out.append(frame[: FRAME_HEADER.size] + payload[skip:])
+            continue
+        elif dropped < seconds and frame_type == FRAME_OPUS:
+            dropped += OPUS_FRAME_SECONDS
+            continue
+        out.append(frame)
+    return out, min(dropped, seconds)
+
+
+class UtteranceReplay:
+    """The frames of the utterance being spoken, kept so an overlay that (re)connects mid-utterance can
+    pick it up from where playback currently is instead of missing it.
+
+    Chunks are encoded here, once per codec in use. A codec that joins mid-utterance gets its own encoder
+    starting at the resume point.
+    """
+
+    def __init__(self, utterance_id: int, make_encoder: Callable[[str, int], UtteranceEncoder]):
+        self.utterance_id = utterance_id
+        self._make_encoder = make_encoder
+        self._encoders: dict[str, UtteranceEncoder] = {}
+        # (raw chunk or None for the end, duration, frames per codec)
+        self._chunks: list[tuple[bytes | None, float, dict[str, list[bytes]]]] = []
+        self._clock = PlaybackClock()
+        self._sent = 0.0
+
+    def _encode(self, codec: str, chunk: bytes | None) -> list[bytes]:
+        if codec not in self._encoders:
+            self._encoders[codec] = self._make_encoder(codec, self.utterance_id)
+        encoder = self._encoders[codec]
+        return encoder.encode(chunk) if chunk is not None else encoder.end()
+
+    def encode(self, codecs, chunk: bytes = None, duration: float = 0.0) -> dict[str, list[bytes]]:
+        """Encode a chunk, or the end of the utterance if `chunk` is None, for every codec in `codecs`."""
+        frames = {codec: self._encode(codec, chunk) for codec in codecs}
+        self._chunks.append((chunk, duration or 0.0, frames))
+        self._clock.add(duration or 0.0, time.monotonic())
+        self._sent += duration or 0.0
+        return frames
+
+    def played(self) -> float:
+        """Seconds of this utterance an overlay that has been connected all along has played by now."""
+        return self._sent - self._clock.lead(time.monotonic())
+
+    def resume(self, codec: str) -> tuple[list[bytes], float]:
+        """Frames to bring a new client up to date, and the seconds of audio they hold. The chunk that is
+        playing right now is cut at the playback position, so the client doesn't hear that part twice."""
+        played = self.played()
+        joining = codec not in self._encoders
+        frames = []
+        remaining = 0.0
+        position = 0.0
+        wav_format = None
+        first = True
+        for chunk, duration, encoded in self._chunks:
+            position += duration
+            if chunk is not None and position <= played:
+                # Already played, but the client still needs the stream format in effect
+                if not joining:
+                    for frame in encoded[codec]:
+                        if frame[1] == FRAME_FORMAT:
+                            frames.append(frame)
+                            wav_format = FORMAT_PAYLOAD.unpack(frame[FRAME_HEADER.size :])
+                continue
+            if joining:
+                encoded[codec] = self._encode(codec, chunk)
+            chunk_frames = encoded[codec]
+            if first and chunk is not None:
+                first = False
+                offset = played - (position - duration)
+                if offset > 0:
+                    chunk_frames, trimmed = trim_frames(chunk_frames, offset, wav_format)
+                    duration -= trimmed
+            frames += chunk_frames
+            remaining += duration
+        return frames, remaining
@@ -1,5 +1,7 @@
+import time
+import asyncio
+import threading
 from logging import getLogger
-from functools import lru_cache
 
 from tts.local_tts import LocalTTS
 from tts.elevenlabs_tts import ElevenLabsTTS
@@ -8,28 +10,81 @@ from tts.pocket_tts import PocketTTS
 from tts.tts import TTS
 from helpers.constants import TTS_SOURCE
 
+from chatdnd.events.tts_events import on_tts_ready
+
 logger = getLogger("ChatDND")
 
-__all__ = ["LocalTTS", "ElevenLabsTTS", "StreamElementsTTS", "PocketTTS", 'TTS', "get_tts"]
+__all__ = ["LocalTTS", "ElevenLabsTTS", "StreamElementsTTS", "PocketTTS", 'TTS', "get_tts", "wait_for_tts", "tts_ready", "ready_tts", "init_tts_engines", "close_tts_engines"]
 
 _tts_store_ = {}
 _tts_classes_ = [LocalTTS, ElevenLabsTTS, StreamElementsTTS, PocketTTS]
+# Engines are created on first use, or all at once in the background by init_tts_engines
+_tts_locks_ = {cls.source_type: threading.Lock() for cls in _tts_classes_}
+_tts_ready_ = {cls.source_type: threading.Event() for cls in _tts_classes_}
+
+
+def _create_tts(name: TTS_SOURCE) -> TTS | None:
+    with _tts_locks_[name]:
+        if name in _tts_store_:
+            return _tts_store_[name]
+        cls = next(cls for cls in _tts_classes_ if cls.source_type == name)
+        start = time.perf_counter()
+        tts = None
+        try:
+            tts = cls()
+            logger.info(f"{name.value} TTS ready in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Could not initialize {name.value} TTS after {time.perf_counter() - start:.2f}s: {e}")
+        _tts_store_[name] = tts
+        _tts_ready_[name].set()
+    on_tts_ready.trigger([name])
+    return tts
+
+
+def init_tts_engines():
+    """Start creating every engine concurrently in the background. Setup can be slow (model loads,
+    network calls), and nothing else should wait on it."""
+    for cls in _tts_classes_:
+        if cls.source_type in _tts_store_:
+            continue
+        thread = threading.Thread(target=_create_tts, args=(cls.source_type,), name=f"TTS-Init-{cls.source_type.value}")
+        thread.daemon = True
+        thread.start()
+
+
+def tts_ready(name: TTS_SOURCE) -> bool:
+    return name in _tts_ready_ and _tts_ready_[name].is_set()
+
+
+def ready_tts(name: TTS_SOURCE) -> LocalTTS | ElevenLabsTTS | StreamElementsTTS | PocketTTS | None:
+    # Never blocks, for the Tk thread. None while the engine is starting (wait for on_tts_ready) or if it failed
+    if not tts_ready(name):
+        return None
+    return _tts_store_.get(name)
 
-# def initialize_tts():
-#     # Initialize once globally and import instances where needed
-#     for tts_cls in [LocalTTS, ElevenLabsTTS, StreamElementsTTS]:
-#         if tts_cls.source_type in SOURCES and tts_cls.source_type not in tts_instances:
-#             tts_instances[tts_cls.source_type] = tts_cls()
 
-@lru_cache(maxsize=None)
 def get_tts(name: TTS_SOURCE) -> LocalTTS | ElevenLabsTTS | StreamElementsTTS | PocketTTS | None:
+    # Blocks while the engine is still initializing. Use wait_for_tts from async code
     if not name:
         return None
     if name in _tts_store_:
-        return  _tts_store_.get(name)
-    for cls in _tts_classes_:
-        if cls.source_type == name:
-            tts = cls()
-            _tts_store_[name] = tts
-            return tts
-    return None
+        return _tts_store_.get(name)
+    if name not in _tts_locks_:
+        return None
+    return _create_tts(name)
+
+
+async def wait_for_tts(name: TTS_SOURCE) -> LocalTTS | ElevenLabsTTS | StreamElementsTTS | PocketTTS | None:
+    if not name or name in _tts_store_:
+        return _tts_store_.get(name)
+    return await asyncio.to_thread(get_tts, name)
+
+
+async def close_tts_engines():
+    for tts in list(_tts_store_.values()):
+        if tts is None:
+            continue
+        try:
+            await tts.aclose()
+        except Exception as e:
+            logger.warning(f"Could not close {tts.source_type.value} TTS: {e}")
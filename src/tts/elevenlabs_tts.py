@@ -1,14 +1,18 @@
 import asyncio
 import threading
 import io
+import httpx
 
 from elevenlabs.client import AsyncElevenLabs
 from elevenlabs.client import ElevenLabs
 from elevenlabs.types import Voice as ELVoice
+from elevenlabs.core.api_error import ApiError
 from elevenlabs import play
-from elevenlabs.core.api_error import ApiError as ELApiError
 
 from tts.tts import TTS, create_wav_header
+from tts.elevenlabs_usage import ElevenLabsUsageTracker
+from tts.voice_catalog import get_voice_catalog
+from tts.preview_store import get_preview_store
 
 from helpers.instance_manager import get_config
 from helpers.utils import run_coroutine_sync, try_get_cache
@@ -19,10 +23,9 @@ from chatdnd.events.tts_events import (
     on_elevenlabs_connect,
     request_elevenlabs_connect,
     on_elevenlabs_test_speak,
-    on_elevenlabs_subscription_update,
 )
 
-from data.voices import _upsert_voice, fetch_voices, get_all_voice_ids, delete_voice
+from data.voices import _upsert_voice, get_all_voice_ids, delete_voice
 from data.member import remove_tts
 
 FORMAT = "pcm_22050"  # Match local tts quality, not top but still good
@@ -31,10 +34,18 @@ MODEL = "eleven_flash_v2_5"  #'eleven_monolingual_v1'
 
 class ElevenLabsTTS(TTS):
     source_type = TTS_SOURCE.SOURCE_11L
+
+    @property
+    def segment_text(self) -> bool:
+        # The streaming endpoint sends audio while the rest of the message is still being generated
+        config = get_config(name="default")
+        return not config.getboolean(section="ELEVENLABS", option="streaming", fallback=True)
+
     def __init__(self):
         super().__init__()
         self.client: AsyncElevenLabs = None
-        request_elevenlabs_connect.addListener(self.setup)
+        self.usage = ElevenLabsUsageTracker()
+        request_elevenlabs_connect.addListener(self.connect)
 
         self.setup()
         on_elevenlabs_test_speak.addListener(self.test_speak)
@@ -44,41 +55,46 @@ class ElevenLabsTTS(TTS):
     @property
     def voices(self) -> dict:
         d = {}
-        _voices = run_coroutine_sync(fetch_voices(source=self.source_type))
-        for v in _voices:
-            if v:
-                d.setdefault(f"{v.name} ({v.uid})", v.uid)
+        for v in get_voice_catalog().voices(source=self.source_type):
+            d.setdefault(f"{v.name} ({v.uid})", v.uid)
         return d
 
     def setup(self):
+        # Engines are created in a thread before the app's loop runs, the first check finishes here
+        run_coroutine_sync(self.connect())
+
+    async def connect(self):
         on_elevenlabs_connect.trigger([False])
         config = get_config("default")
         if key := config.get(section="ELEVENLABS", option="api_key"):
             try:
-                test_client = ElevenLabs(api_key=key)
-                # This will cause an exception if invalid api key
-                user_subscription = test_client.user.subscription.get()
-                count = user_subscription.character_count
-                limit = user_subscription.character_limit
-                on_elevenlabs_subscription_update.trigger([count, limit])
-
+                # Checked with a client of its own, this may run on a short-lived loop
+                async with httpx.AsyncClient(timeout=60) as http:
+                    check_client = AsyncElevenLabs(api_key=key, httpx_client=http)
+                    # This will cause an exception if invalid api key
+                    user_subscription = await check_client.user.subscription.get()
+                    available_voices = [v.voice_id for v in (await check_client.voices.get_all()).voices]
+
+                self.usage.update(user_subscription.character_count, user_subscription.character_limit)
                 self.client = AsyncElevenLabs(api_key=key)
+                self.usage.set_client(self.client)
+                self.usage.ensure_polling()
 
                 # Remove all voices from system if they are not available on the account anymore
-                available_voices = [v.voice_id for v in test_client.voices.get_all().voices]
-                db_voice_ids = run_coroutine_sync(get_all_voice_ids(source=self.source_type))
+                db_voice_ids = await get_all_voice_ids(source=self.source_type)
                 unavailable_voices = []
                 for uid in db_voice_ids:
                     if uid not in available_voices:
                         unavailable_voices.append(uid)
 
                 if unavailable_voices:
-                    run_coroutine_sync(remove_tts(voice_id=unavailable_voices))
-                    run_coroutine_sync(delete_voice(uid=unavailable_voices, source=self.source_type))
+                    await remove_tts(voice_id=unavailable_voices)
+                    await delete_voice(uid=unavailable_voices, source=self.source_type)
                 on_elevenlabs_connect.trigger([True])
 
             except Exception as e:
                 logger.warning(f"ElevenLabs Exception: {e}")
+                self.usage.set_client(None)
                 on_elevenlabs_connect.trigger([False])
 
     async def audio_stream_generator(self, text="Hello World!", voice_id: str = None):
@@ -95,10 +111,25 @@ class ElevenLabsTTS(TTS):
 
         return await fetch_stream(self.client, text, voice_id, MODEL, FORMAT)
 
+    def cache_params(self) -> tuple:
+        return super().cache_params() + (MODEL, FORMAT)
+
     async def get_stream(self, text="Hello World!", voice_id: str = None):
         if not voice_id or not self.client:
             yield None, None
+            return
+
+        config = get_config(name="default")
+        if config.getboolean(section="ELEVENLABS", option="streaming", fallback=True):
+            stream = self._get_stream_incremental(text, voice_id)
+        else:
+            stream = self._get_stream_full(text, voice_id)
+        async for chunk, duration in stream:
+            yield (chunk, duration)
+
+        self.usage.record(text, MODEL)
 
+    async def _get_stream_full(self, text="Hello World!", voice_id: str = None):
         output = await self.audio_stream_generator(text, voice_id)
 
         header = create_wav_header(
@@ -112,14 +143,47 @@ class ElevenLabsTTS(TTS):
 
         while chunk:
             duration = len(chunk) / (self.sample_rate * self.num_channels * (self.bits_per_sample // 8))
-            await asyncio.sleep(duration)
             yield (header + chunk, duration)
             chunk = output.read(chunk_size)
 
-        user_subscription = await self.client.user.subscription.get()
-        count = user_subscription.character_count
-        limit = user_subscription.character_limit
-        on_elevenlabs_subscription_update.trigger([count, limit])
+    async def _get_stream_incremental(self, text="Hello World!", voice_id: str = None):
+        # Forward PCM to the overlay as it arrives from the API instead of waiting for the whole clip.
+        # A small jitter buffer is kept so the overlay isn't handed tiny chunks it would play back with gaps.
+        config = get_config(name="default")
+        block_align = self.num_channels * (self.bits_per_sample // 8)
+        bytes_per_second = self.sample_rate * block_align
+        jitter_ms = config.getint(section="ELEVENLABS", option="jitter_buffer_ms", fallback=250)
+        jitter_bytes = max(block_align, int(bytes_per_second * jitter_ms / 1000) // block_align * block_align)
+        max_chunk_size = self.max_chunk_size // block_align * block_align
+
+        buffer = bytearray()
+        failed = False
+
+        try:
+            async for data in self.client.text_to_speech.stream(text=text, voice_id=voice_id, model_id=MODEL, output_format=FORMAT):
+                buffer.extend(data)
+                if len(buffer) < jitter_bytes:
+                    continue
+                size = min(max_chunk_size, len(buffer) // block_align * block_align)
+                chunk = bytes(buffer[:size])
+                del buffer[:size]
+                duration = len(chunk) / bytes_per_second
+                yield (create_wav_header(self.sample_rate, self.bits_per_sample, self.num_channels, len(chunk)) + chunk, duration)
+        except (httpx.HTTPError, ApiError) as e:
+            # The connection can drop mid-utterance. Play what did arrive and end there
+            logger.error(f"ElevenLabs stream failed for '{text}': {e}")
+            failed = True
+
+        size = len(buffer) // block_align * block_align
+        while size:
+            chunk = bytes(buffer[: min(size, max_chunk_size)])
+            del buffer[: len(chunk)]
+            size -= len(chunk)
+            duration = len(chunk) / bytes_per_second
+            yield (create_wav_header(self.sample_rate, self.bits_per_sample, self.num_channels, len(chunk)) + chunk, duration)
+        if failed:
+            # Keeps the partial utterance out of the utterance cache
+            yield (None, None)
 
     def import_all(self, run_sync_always: bool = False) -> bool:
         did_import = False
@@ -230,11 +294,10 @@ class ElevenLabsTTS(TTS):
 
         key = f"11l.preview.{voice_id}"
         audio = None
-        cache = try_get_cache("default")
-        if cache is not None:
-            audio_l = cache.get(key=key, default=None)
-            if audio_l:
-                audio = iter(audio_l)
+        store = get_preview_store()
+        if store:
+            audio = store.get(key)
+            if audio:
                 logger.debug(f"Fetched cached preview audio for `{voice_id}`")
         if not audio:
             def preview_audio_th():
@@ -244,26 +307,10 @@ class ElevenLabsTTS(TTS):
                 except Exception:
                     on_elevenlabs_connect.trigger([False])  # needed?
                     return
-                audio = list(client.text_to_speech.convert(text=text, voice_id=voice_id, model_id=MODEL))
-                if cache is not None:
-                    cache.set(
-                        key=key,
-                        expire=config.getint(
-                            section="CACHE",
-                            option="tts_cache_expiry",
-                            fallback=7 * 24 * 60 * 60 * 4 * 3,
-                        ),
-                        value=list(audio),
-                    )
-                audio = iter(audio)
-
-                try:
-                    user_subscription = client.user.subscription.get()
-                    count = user_subscription.character_count
-                    limit = user_subscription.character_limit
-                    on_elevenlabs_subscription_update.trigger([count, limit])
-                except ELApiError as ex:
-                    logger.warning(f"Elevenlabs API Error, cannot update credit count: {ex}")
+                audio = b"".join(client.text_to_speech.convert(text=text, voice_id=voice_id, model_id=MODEL))
+                if store:
+                    store.put(key, audio)
+                self.usage.record(text, MODEL)
 
                 play(audio)
             # Perform the whole request in a separate thread to avoid microsecond hang
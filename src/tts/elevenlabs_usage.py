@@ -0,0 +1,83 @@
+import math
+import asyncio
+import threading
+
+from elevenlabs.client import AsyncElevenLabs
+
+from helpers.instance_manager import get_config
+from helpers.event import queue_on_main_loop
+from custom_logger.logger import logger
+
+from chatdnd.events.tts_events import on_elevenlabs_subscription_update
+
+# Credits charged per character, flash/turbo models are half price
+MODEL_CREDIT_COST = {
+    "eleven_flash_v2_5": 0.5,
+    "eleven_turbo_v2_5": 0.5,
+}
+
+
+class ElevenLabsUsageTracker:
+    """Tracks ElevenLabs character usage locally and reconciles with the API on an interval.
+
+    This is the only place `on_elevenlabs_subscription_update` is published from, so synthesizing a
+    message doesn't need a subscription request of its own.
+    """
+
+    def __init__(self):
+        self.count: int | None = None
+        self.limit: int | None = None
+        self._client: AsyncElevenLabs = None
+        self._task: asyncio.Task = None
+        self._lock = threading.Lock()
+
+    def set_client(self, client: AsyncElevenLabs | None):
+        self._client = client
+        if client is None and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def update(self, count: int, limit: int):
+        with self._lock:
+            self.count = count
+            self.limit = limit
+        on_elevenlabs_subscription_update.trigger([count, limit])
+
+    def record(self, text: str, model: str):
+        """Estimate usage for a synthesized message from its length."""
+        if self.count is None or not text:
+            return
+        with self._lock:
+            self.count += math.ceil(len(text) * MODEL_CREDIT_COST.get(model, 1))
+            count, limit = self.count, self.limit
+        on_elevenlabs_subscription_update.trigger([count, limit])
+        self.ensure_polling()
+
+    def ensure_polling(self):
+        """Start reconciling with the API, on the app's main loop. Setup and previews run in other threads,
+        some on loops that only live for one call, so from there it is handed over to the main loop."""
+        if self._client is None or (self._task and not self._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or threading.current_thread() is not threading.main_thread():
+            queue_on_main_loop(self.ensure_polling)
+            return
+        self._task = loop.create_task(self._poll())
+
+    async def reconcile(self):
+        if self._client is None:
+            return
+        user_subscription = await self._client.user.subscription.get()
+        self.update(user_subscription.character_count, user_subscription.character_limit)
+
+    async def _poll(self):
+        config = get_config(name="default")
+        while self._client is not None:
+            await asyncio.sleep(config.getint(section="ELEVENLABS", option="usage_poll_interval", fallback=300))
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.warning(f"Elevenlabs API Error, cannot update credit count: {e}")
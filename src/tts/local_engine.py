@@ -0,0 +1,105 @@
+import io
+import threading
+from concurrent.futures import Future
+from queue import Queue as SyncQueue
+
+import pyttsx4
+
+from custom_logger.logger import logger
+
+
+def friendly_name(name: str) -> str:
+    return name.split("-")[0].replace("Desktop", "").replace("Microsoft", "").strip()
+
+
+class LocalEngineWorker:
+    """Owns a single long-lived pyttsx4 engine on a dedicated thread.
+
+    Driver init is slow, and the engine isn't safe to share across threads, so every call goes through
+    a job queue and hands back a Future. Async code can `await asyncio.wrap_future(...)` it.
+    """
+
+    def __init__(self):
+        self._jobs = SyncQueue()
+        self._voices: list[tuple[str, str]] = None
+        self._defaults: dict = {}
+        self._voices_ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="LocalTTS-Engine", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        engine = None
+        try:
+            # We are using the fork for x4 as it works with outputting to bytesIO
+            engine = pyttsx4.init()
+            self._voices = [(v.id, v.name) for v in engine.getProperty("voices")]
+            # The engine is reused, so every job starts from these instead of what the last one set
+            self._defaults = {prop: engine.getProperty(prop) for prop in ("voice", "rate", "volume")}
+        except Exception as e:
+            logger.error(f"Could not start local TTS engine: {e}")
+            self._voices = []
+        finally:
+            self._voices_ready.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            func, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if engine is None:
+                    raise RuntimeError("Local TTS engine is not available")
+                future.set_result(func(engine, *args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, func, *args) -> Future:
+        """Run `func(engine, *args)` on the engine thread."""
+        future = Future()
+        self._jobs.put((func, args, future))
+        return future
+
+    def voices(self, timeout: float = 30) -> list[tuple[str, str]]:
+        """Cached (id, name) of every installed voice."""
+        self._voices_ready.wait(timeout=timeout)
+        return self._voices or []
+
+    def voice_id_by_friendly_name(self, name: str) -> str | None:
+        name = name.lower().strip()
+        for uid, voice_name in self.voices():
+            if friendly_name(voice_name).lower() == name:
+                return uid
+        return None
+
+    def _configure(self, engine, voice_id: str, rate: int = None, volume: float = None):
+        if not voice_id or voice_id not in (uid for uid, _ in self.voices()):
+            voice_id = self._defaults.get("voice")
+        for prop, value in (("voice", voice_id), ("rate", rate), ("volume", volume)):
+            if value is None:
+                value = self._defaults.get(prop)
+            if value is not None:
+                engine.setProperty(prop, value)
+
+    def synthesize(self, text: str, voice_id: str, rate: int, volume: float) -> Future:
+        def _synthesize(engine, text, voice_id):
+            self._configure(engine, voice_id, rate, volume)
+            output = io.BytesIO()
+            engine.save_to_file(text, output)
+            engine.runAndWait()
+            output.seek(0)
+            return output
+
+        return self.submit(_synthesize, text, voice_id)
+
+    def speak(self, text: str, voice_id: str, rate: int = None, volume: float = None) -> Future:
+        def _speak(engine, text, voice_id):
+            self._configure(engine, voice_id, rate, volume)
+            engine.say(text)
+            engine.runAndWait()
+
+        return self.submit(_speak, text, voice_id)
+
+    def stop(self):
+        self._jobs.put(None)
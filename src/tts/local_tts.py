@@ -1,30 +1,32 @@
 import asyncio
 import threading
-import io
-import pyttsx4
 
 from tts.tts import TTS, create_wav_header
+from tts.local_engine import LocalEngineWorker, friendly_name
+from tts.voice_catalog import get_voice_catalog
 
 from helpers.utils import run_coroutine_sync
+from helpers.instance_manager import register_cleanup
 from helpers.constants import TTS_SOURCE
 
-from data.voices import _upsert_voice, fetch_voices, get_all_voice_ids
+from data.voices import _upsert_voice, get_all_voice_ids
 
-# TODO: For local TTS, there is a slight minor clipping when transitioning between chunks.
-# Mitigated with a large chunk size, need better solution? may be fixed
+RATE = 150  # Speed of speech
+VOLUME = 1  # Volume level (0.0 to 1.0)
 
 
 class LocalTTS(TTS):
     source_type = TTS_SOURCE.SOURCE_LOCAL
     def __init__(self):
         super().__init__()
+        self.engine = LocalEngineWorker()
+        register_cleanup(self.engine, 'stop')
 
         def _init_values():
-            engine = pyttsx4.init()
             db_voice_ids = run_coroutine_sync(get_all_voice_ids(source=self.source_type))
-            for v in engine.getProperty("voices"):
-                if v.id not in db_voice_ids:
-                    run_coroutine_sync(_upsert_voice(name=v.name, uid=v.id, source=self.source_type))
+            for uid, name in self.engine.voices():
+                if uid not in db_voice_ids:
+                    run_coroutine_sync(_upsert_voice(name=name, uid=uid, source=self.source_type))
         thread = threading.Thread(target=_init_values)
         thread.daemon = True
         thread.start()
@@ -32,54 +34,30 @@ class LocalTTS(TTS):
     @property
     def voices(self) -> dict:
         d = {}
-        _voices = run_coroutine_sync(fetch_voices(source=self.source_type))
-        for v in _voices:
+        for v in get_voice_catalog().voices(source=self.source_type):
             d.setdefault(f"{v.name}", v.uid)
         return d
 
     def list_voices(self) -> list:
-        friendly_names = list()
-        engine = pyttsx4.init()
-        for v in engine.getProperty("voices"):
-            n = v.name.split("-")[0].replace("Desktop", "").replace("Microsoft", "").strip()
-            friendly_names.append(n)
-        return friendly_names
+        return [friendly_name(name) for _, name in self.engine.voices()]
 
     def get_voice_id_by_friendly_name(self, name: str) -> str:
         if not name:
             return None
-        engine = pyttsx4.init()
-        for v in engine.getProperty("voices"):
-            n = v.name.split("-")[0].replace("Desktop", "").replace("Microsoft", "").strip()
-            if n.lower() == name.lower().strip():
-                return v.id
+        return self.engine.voice_id_by_friendly_name(name)
 
     def voice_list_message(self) -> str:
         voices = self.list_voices()
         return "Local Voices: " + ", ".join(voices)
 
     def audio_stream_generator(self, text="Hello World!", voice_id: str = None):
-        engine = pyttsx4.init()  # We are using the fork for x4 as it works with outputting to bytesIO
-        output = io.BytesIO()
+        return self.engine.synthesize(text, voice_id, RATE, VOLUME).result()
 
-        if voice_id and voice_id in self.get_voices().values():
-            engine.setProperty("voice", voice_id)
-
-        engine.setProperty("rate", 150)  # Speed of speech
-        engine.setProperty("volume", 1)  # Volume level (0.0 to 1.0)
-
-        engine.save_to_file(text, output)
-        _th = threading.Thread(target=engine.runAndWait)
-        _th.daemon = True
-        _th.start()
-        _th.join()
-
-        output.seek(0)
-
-        return output
+    def cache_params(self) -> tuple:
+        return super().cache_params() + (RATE, VOLUME)
 
     async def get_stream(self, text="Hello World!", voice_id: str = ""):
-        output = self.audio_stream_generator(text, voice_id)
+        output = await asyncio.wrap_future(self.engine.synthesize(text, voice_id, RATE, VOLUME))
         header = create_wav_header(
             self.sample_rate,
             self.bits_per_sample,
@@ -91,18 +69,8 @@ class LocalTTS(TTS):
 
         while chunk:
             duration = len(chunk) / (self.sample_rate * self.num_channels * (self.bits_per_sample // 8))
-            await asyncio.sleep(duration)
             yield (header + chunk, duration)
             chunk = output.read(chunk_size)
 
     def test_speak(self, text: str = "Hello there. How are you?", voice_id: str = None):
-        def _run(text, voice_id):
-            engine = pyttsx4.init()
-            if voice_id in self.voices.values():
-                engine.setProperty("voice", voice_id)
-            engine.say(text)
-            engine.runAndWait()
-
-        thread = threading.Thread(target=_run, args=(text, voice_id))
-        thread.daemon = True
-        thread.start()
+        self.engine.speak(text, voice_id)
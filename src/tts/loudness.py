@@ -0,0 +1,243 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from helpers.instance_manager import get_config
+from helpers.utils import try_get_cache
+from helpers.constants import TTS_SOURCE
+from tts.pcm import apply_limited_gain, parse_wav_chunk
+from custom_logger.logger import logger
+
+# Integrated loudness per ITU-R BS.1770 / EBU R128, used to level every voice to the same target
+
+# K-weighting biquads as specified at 48kHz: high shelf, then the RLB high pass
+_K_SHELF = ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585))
+_K_HIGHPASS = ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621))
+
+BLOCK_SECONDS = 0.4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+MIN_MEASURE_SECONDS = 1.0
+MAX_GAIN_DB = 20.0
+# How far past full scale a voice's loudest sample may be pushed, the limiter rounds off the rest
+LIMITER_DRIVE_DB = 6.0
+
+
+def _k_weighting_response(freqs: np.ndarray) -> np.ndarray:
+    """|H(f)|^2 of the K-weighting filter. Magnitude only, the phase doesn't matter for energy."""
+    z = np.exp(-2j * np.pi * freqs / 48000)
+    power = np.ones(len(freqs))
+    for b, a in (_K_SHELF, _K_HIGHPASS):
+        h = (b[0] + b[1] * z + b[2] * z**2) / (a[0] + a[1] * z + a[2] * z**2)
+        power *= np.abs(h) ** 2
+    return power
+
+
+def gated_block_power(samples: np.ndarray, sample_rate: int) -> np.ndarray | None:
+    """Mean square of the K-weighted 400ms blocks that pass both loudness gates. None if there is too
+    little (or no) audio."""
+    block = int(BLOCK_SECONDS * sample_rate)
+    if len(samples) < block:
+        return None
+
+    # K-weight in the frequency domain, avoids a per-sample IIR loop in python
+    spectrum = np.fft.rfft(samples.astype(np.float64))
+    spectrum *= np.sqrt(_k_weighting_response(np.fft.rfftfreq(len(samples), d=1 / sample_rate)))
+    weighted = np.fft.irfft(spectrum, n=len(samples))
+
+    # Mean square of 400ms blocks overlapping by 75%
+    step = block // 4
+    energy = np.concatenate(([0.0], np.cumsum(weighted**2)))
+    starts = np.arange(0, len(samples) - block + 1, step)
+    block_power = (energy[starts + block] - energy[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+    gated = block_power[block_loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = block_power[block_loudness > max(ABSOLUTE_GATE, relative)]
+    if not len(gated):
+        return None
+    return gated
+
+
+def _power_to_lufs(power: float) -> float:
+    return float(-0.691 + 10 * np.log10(power))
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float | None:
+    """Gated integrated loudness of mono float samples, in LUFS. None if there is too little (or no) audio."""
+    gated = gated_block_power(samples, sample_rate)
+    if gated is None:
+        return None
+    return _power_to_lufs(gated.mean())
+
+
+def pcm16_to_mono(pcm: bytes, channels: int) -> np.ndarray:
+    samples = np.frombuffer(pcm[: len(pcm) - len(pcm) % (2 * channels)], dtype="<i2").astype(np.float32) / 32768
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+class VoiceLoudness:
+    """What has been heard from a voice so far: the summed power and count of its gated blocks, and its
+    loudest sample. Every utterance is folded in, so the measurement keeps improving as the voice speaks."""
+
+    __slots__ = ("power", "blocks", "peak")
+
+    def __init__(self, power: float = 0.0, blocks: int = 0, peak: float = 0.0):
+        self.power = power
+        self.blocks = blocks
+        self.peak = peak
+
+    @property
+    def lufs(self) -> float | None:
+        return _power_to_lufs(self.power / self.blocks) if self.blocks else None
+
+    def add(self, gated: np.ndarray | None, peak: float):
+        if gated is not None:
+            self.power += float(gated.sum())
+            self.blocks += len(gated)
+        self.peak = max(self.peak, peak)
+
+    def as_tuple(self) -> tuple[float, int, float]:
+        return (self.power, self.blocks, self.peak)
+
+
+class LoudnessNormalizer:
+    """Levels every voice to a shared loudness target, one fixed gain per utterance.
+
+    A voice is measured over everything it has said, stored in the default cache (no expiry) keyed by
+    source and voice id. Its gain is capped so its loudest sample can't drive more than LIMITER_DRIVE_DB into
+    the limiter, which catches whatever is left. The gain is applied to the PCM on the way out, so the
+    utterance cache keeps the raw engine audio.
+    """
+
+    def __init__(self):
+        self._voices: dict[str, VoiceLoudness] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(source: TTS_SOURCE, voice_id: str) -> str:
+        return f"loudness.v3.{source.value}.{voice_id or 'default'}"
+
+    @staticmethod
+    def enabled() -> bool:
+        config = get_config(name="default")
+        return config.getboolean(section="TTS", option="normalize_loudness", fallback=True)
+
+    def voice(self, source: TTS_SOURCE, voice_id: str) -> VoiceLoudness | None:
+        key = self._key(source, voice_id)
+        with self._lock:
+            if key not in self._voices:
+                cache = try_get_cache("default")
+                value = cache.get(key=key, default=None) if cache is not None else None
+                if value is None:
+                    return None
+                self._voices[key] = VoiceLoudness(*value)
+            return self._voices[key]
+
+    def update(self, source: TTS_SOURCE, voice_id: str, samples: np.ndarray, sample_rate: int):
+        """Fold a whole utterance into the voice's measurement."""
+        gated = gated_block_power(samples, sample_rate)
+        peak = float(np.abs(samples).max()) if len(samples) else 0.0
+        key = self._key(source, voice_id)
+        measured = self.voice(source, voice_id)
+        with self._lock:
+            if measured is None:
+                measured = self._voices.setdefault(key, VoiceLoudness())
+            first = not measured.blocks
+            measured.add(gated, peak)
+            value = measured.as_tuple()
+        cache = try_get_cache("default")
+        if cache is not None:
+            cache.set(key=key, value=value)
+        if first and measured.blocks:
+            logger.info(f"Measured loudness of {source.value} voice '{voice_id or 'default'}': {measured.lufs:.1f} LUFS")
+
+    @staticmethod
+    def _gain_for(lufs: float | None, peak: float) -> float | None:
+        if lufs is None:
+            return None
+        config = get_config(name="default")
+        target = config.getfloat(section="TTS", option="target_lufs", fallback=-16.0)
+        gain = max(-MAX_GAIN_DB, min(MAX_GAIN_DB, target - lufs))
+        if peak > 0:
+            gain = min(gain, LIMITER_DRIVE_DB - 20 * np.log10(peak))
+        return float(gain)
+
+    def gain_db(self, source: TTS_SOURCE, voice_id: str) -> float | None:
+        measured = self.voice(source, voice_id)
+        if measured is None:
+            return None
+        return self._gain_for(measured.lufs, measured.peak)
+
+    def apply(self, chunk: bytes, gain_db: float | None) -> bytes:
+        parsed = parse_wav_chunk(chunk)
+        if not gain_db or parsed is None:
+            return chunk
+        header, pcm, (_, _, bits_per_sample) = parsed
+        if bits_per_sample != 16:
+            return chunk
+        return header + apply_limited_gain(pcm, gain_db)
+
+    async def normalize(self, source: TTS_SOURCE, voice_id: str, stream):
+        """Wrap a `(chunk, duration)` stream. The gain is picked once and kept for the whole utterance. An
+        unmeasured voice is held back until about a second of audio has arrived (or the stream ends) so its
+        first utterance plays at the right level too. Afterwards the utterance is added to the voice's
+        measurement."""
+        if not self.enabled():
+            async for item in stream:
+                yield item
+            return
+
+        gain = self.gain_db(source, voice_id)
+        held = []
+        held_seconds = 0.0
+        samples = []
+        sample_rate = None
+        async for chunk, duration in stream:
+            if chunk is None:
+                yield (chunk, duration)
+                continue
+            parsed = parse_wav_chunk(chunk)
+            if parsed is not None and parsed[2][2] == 16:
+                rate, channels, _ = parsed[2]
+                sample_rate = sample_rate or rate
+                if rate == sample_rate:
+                    samples.append(pcm16_to_mono(parsed[1], channels))
+            if gain is not None:
+                yield (self.apply(chunk, gain), duration)
+                continue
+            held.append((chunk, duration))
+            held_seconds += duration or 0
+            if held_seconds >= MIN_MEASURE_SECONDS:
+                gain = self._measure_held(samples, sample_rate)
+                for item in held:
+                    yield (self.apply(item[0], gain), item[1])
+                held = []
+
+        if samples:
+            # Off the loop, a long utterance is a few MB of samples to transform
+            await asyncio.to_thread(self.update, source, voice_id, np.concatenate(samples), sample_rate)
+        if held:
+            gain = self.gain_db(source, voice_id)
+            for chunk, duration in held:
+                yield (self.apply(chunk, gain), duration)
+
+    def _measure_held(self, samples: list, sample_rate: int | None) -> float:
+        if not samples:
+            return 0.0
+        audio = np.concatenate(samples)
+        gain = self._gain_for(integrated_loudness(audio, sample_rate), float(np.abs(audio).max()))
+        return gain or 0.0
+
+
+@lru_cache(maxsize=None)
+def get_loudness_normalizer() -> LoudnessNormalizer:
+    return LoudnessNormalizer()
@@ -0,0 +1,117 @@
+import struct
+
+import numpy as np
+
+# Helpers for handling raw PCM audio from the TTS engines
+
+WAV_HEADER_SIZE = 44
+
+
+def parse_wav_header(chunk: bytes) -> tuple[int, int, int] | None:
+    """Return (sample_rate, channels, bits_per_sample) if `chunk` starts with a PCM WAV header."""
+    if len(chunk) < WAV_HEADER_SIZE or chunk[:4] != b"RIFF" or chunk[8:12] != b"WAVE":
+        return None
+    (channels,) = struct.unpack_from("<H", chunk, 22)
+    (sample_rate,) = struct.unpack_from("<I", chunk, 24)
+    (bits_per_sample,) = struct.unpack_from("<H", chunk, 34)
+    return sample_rate, channels, bits_per_sample
+
+
+def parse_wav_chunk(chunk: bytes) -> tuple[bytes, bytes, tuple[int, int, int]] | None:
+    """Split a WAV chunk from an engine into (header, pcm, format), None if it isn't one."""
+    wav_format = parse_wav_header(chunk)
+    if wav_format is None:
+        return None
+    return chunk[:WAV_HEADER_SIZE], chunk[WAV_HEADER_SIZE:], wav_format
+
+
+def float_to_pcm16(samples) -> bytes:
+    """Convert float audio samples in [-1.0, 1.0] to little-endian 16-bit PCM bytes."""
+    arr = np.asarray(samples, dtype=np.float32)
+    return (np.clip(arr, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class PCMRingBuffer:
+    """Preallocated float32 ring buffer for accumulating streamed samples without re-slicing lists."""
+
+    def __init__(self, capacity: int):
+        self._buffer = np.zeros(max(1, capacity), dtype=np.float32)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def _grow(self, needed: int):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        data = self.read(self._size)
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._buffer[: len(data)] = data
+        self._start = 0
+        self._size = len(data)
+
+    def write(self, samples):
+        arr = np.asarray(samples, dtype=np.float32).ravel()
+        count = len(arr)
+        if not count:
+            return
+        if self._size + count > self.capacity:
+            self._grow(self._size + count)
+        end = (self._start + self._size) % self.capacity
+        first = min(count, self.capacity - end)
+        self._buffer[end : end + first] = arr[:first]
+        if first < count:
+            self._buffer[: count - first] = arr[first:]
+        self._size += count
+
+    def read(self, count: int) -> np.ndarray:
+        count = min(count, self._size)
+        first = min(count, self.capacity - self._start)
+        if first == count:
+            out = self._buffer[self._start : self._start + count].copy()
+        else:
+            out = np.concatenate((self._buffer[self._start :], self._buffer[: count - first]))
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+        return out
+
+
+def apply_gain(pcm: bytes, gain_db: float) -> bytes:
+    """Apply gain to 16-bit PCM, reducing it where needed so the loudest sample doesn't clip."""
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    if not len(samples) or not gain_db:
+        return pcm
+    gain = 10 ** (gain_db / 20)
+    peak = float(np.abs(samples).max())
+    if peak * gain > 32767:
+        gain = 32767 / peak if peak else gain
+    return np.clip(samples * gain, -32768, 32767).astype("<i2").tobytes()
+
+
+LIMIT_THRESHOLD = 0.89  # -1 dBFS
+
+
+def apply_limited_gain(pcm: bytes, gain_db: float, threshold: float = LIMIT_THRESHOLD) -> bytes:
+    """Apply a fixed gain to 16-bit PCM. Samples that would go past `threshold` of full scale are rounded
+    off smoothly toward full scale instead of clipping.
+
+    Unlike `apply_gain` nothing depends on the rest of the buffer, so the chunks of an utterance given the
+    same gain join up without level steps.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+    if not len(samples) or not gain_db:
+        return pcm
+    samples *= 10 ** (gain_db / 20)
+    magnitude = np.abs(samples)
+    over = magnitude > threshold
+    if over.any():
+        knee = 1.0 - threshold
+        limited = threshold + knee * np.tanh((magnitude[over] - threshold) / knee)
+        samples[over] = np.copysign(limited, samples[over])
+    return np.clip(samples * 32768, -32768, 32767).astype("<i2").tobytes()
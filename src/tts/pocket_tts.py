@@ -1,15 +1,18 @@
 import asyncio
 import os
 import glob
-import struct
 import threading
 from pathlib import Path
 from queue import Queue as SyncQueue
 
-import pocket_tts_bindings
+import numpy as np
 
 from tts.tts import TTS, create_wav_header
-from helpers.instance_manager import get_config
+from tts.pcm import float_to_pcm16, PCMRingBuffer
+from tts.pocket_worker import PocketWorkerPool, load_model
+from tts.pocket_voices import VoicePromptCache
+from tts.voice_catalog import get_voice_catalog
+from helpers.instance_manager import get_config, register_cleanup
 from helpers.utils import run_coroutine_sync
 from helpers.constants import TTS_SOURCE
 from custom_logger.logger import logger
@@ -19,8 +22,9 @@ from chatdnd.events.tts_events import (
     request_pocket_tts_connect,
     on_pocket_tts_test_speak
 )
+from chatdnd.events.session_events import on_party_update
 
-from data.voices import _upsert_voice, fetch_voices
+from data.voices import _upsert_voice
 from elevenlabs import play
 
 
@@ -30,12 +34,19 @@ POCKET_TTS_SAMPLE_RATE = 24000  # Pocket TTS generates at 24kHz
 
 class PocketTTS(TTS):
     source_type = TTS_SOURCE.SOURCE_POCKET
+    segment_text = False  # generate_chunked yields frames as they're generated
 
 
     def __init__(self):
         super().__init__()
         self.client = None
+        self.worker_pool: PocketWorkerPool = None
+        config = get_config(name="default")
+        self.voice_prompts = VoicePromptCache(
+            lambda: self.client, max_size=config.getint(section="POCKET_TTS", option="voice_cache_size", fallback=16)
+        )
         request_pocket_tts_connect.addListener(self.setup)
+        on_party_update.addListener(self.preload_party_voices)
 
         self.setup()
         on_pocket_tts_test_speak.addListener(self.test_speak)
@@ -49,16 +60,18 @@ class PocketTTS(TTS):
     def voices(self) -> dict:
         """Return available voices from the voices directory."""
         d = {}
-        _voices = run_coroutine_sync(fetch_voices(source=self.source_type))
-        for v in _voices:
-            if v:
-                d.setdefault(f"{v.name} ({v.uid})", v.uid)
+        for v in get_voice_catalog().voices(source=self.source_type):
+            d.setdefault(f"{v.name} ({v.uid})", v.uid)
         return d
 
     def setup(self):
         """Initialize Pocket TTS model."""
         on_pocket_tts_connect.trigger([False])
-        
+        if self.worker_pool:
+            self.worker_pool.close()
+            self.worker_pool = None
+        self.voice_prompts.clear()
+
         try:
             logger.info("Loading Pocket TTS model...")
             logger.debug(f"Configured Pocket TTS model path: ")
@@ -99,7 +112,7 @@ class PocketTTS(TTS):
                             attempt_path = filename
                         
                         logger.debug(f"Attempt {i+1}: Trying path: {attempt_path}")
-                        self.client = pocket_tts_bindings.PyTTSModel.load_from_paths(attempt_path,device="cpu",temp=0.8,lsd_decode_steps=5,eos_threshold=-3.5,noise_clamp=1.0)
+                        self.client = load_model(attempt_path)
                         self.model_path = attempt_path
                         logger.info(f"✅ Pocket TTS model loaded successfully (attempt {i+1})")
                         break
@@ -117,18 +130,55 @@ class PocketTTS(TTS):
                 on_pocket_tts_connect.trigger([False])
                 return
 
+            workers = config.getint(section="POCKET_TTS", option="workers", fallback=0)
+            if workers > 0:
+                self.worker_pool = PocketWorkerPool(self.model_path, workers)
+                register_cleanup(self.worker_pool)
+
             on_pocket_tts_connect.trigger([True])
         except Exception as e:
             logger.error(f"❌ Failed to load Pocket TTS model: {e}")
             on_pocket_tts_connect.trigger([False])
 
+    def preload_party_voices(self, members: list = None):
+        """Prepare voice prompts of party members using Pocket TTS so their first message starts faster."""
+        if not self.client or not members:
+            return
+        self.voice_prompts.preload(
+            [m.preferred_tts_uid for m in members if m.preferred_tts and m.preferred_tts.source == self.source_type.value]
+        )
+
+    def _generate(self, text: str, voice_id: str, chunked: bool = True) -> SyncQueue:
+        """Start synthesis in a worker process if configured, otherwise on a thread in this process.
+        Returns a queue of ('frame', samples), ('done', None) and ('error', exception) events.
+        """
+        if self.worker_pool:
+            queue = self.worker_pool.submit(text, voice_id, chunked)
+            if queue is not None:
+                return queue
+            logger.warning("Pocket TTS workers unavailable, generating in-process")
+
+        queue = SyncQueue()
+        def generate_frames():
+            try:
+                if chunked:
+                    for chunk_result in self.client.generate_chunked(text, voice_id):
+                        queue.put(('frame', chunk_result))
+                else:
+                    queue.put(('frame', self.client.generate(text, voice_id)))
+                queue.put(('done', None))
+            except Exception as e:
+                queue.put(('error', e))
+        thread = threading.Thread(target=generate_frames, daemon=True)
+        thread.start()
+        return queue
+
     def _float_samples_to_bytes(self, samples):
         """Convert float audio samples to 16-bit PCM bytes."""
-        # Scale float samples to 16-bit integers
-        scaled = [max(-32768, min(32767, int(s * 32767))) for s in samples]
-        
-        # Pack as little-endian 16-bit integers
-        return struct.pack('<' + 'h' * len(scaled), *scaled)
+        return float_to_pcm16(samples)
+
+    def cache_params(self) -> tuple:
+        return super().cache_params() + (getattr(self, "model_path", ""),)
 
     async def get_stream(self, text="Hello World!", voice_id: str = None, use_chunked: bool = True):
         """Generate audio stream from text using Pocket TTS.
@@ -144,6 +194,8 @@ class PocketTTS(TTS):
             yield None, None
             return
 
+        voice_id = await asyncio.to_thread(self.voice_prompts.resolve, voice_id)
+
         if use_chunked:
             async for chunk, duration in self._get_stream_chunked(text, voice_id):
                 yield (chunk, duration)
@@ -155,10 +207,16 @@ class PocketTTS(TTS):
         """Generate full audio first, then stream in chunks (legacy behavior)."""
         try:
             # Generate full audio using Pocket TTS
-            audio_bytes = await asyncio.to_thread(
-                self.client.generate, text, voice_id
-            )
-            audio_bytes = self._float_samples_to_bytes(audio_bytes)
+            queue = self._generate(text, voice_id, chunked=False)
+            frames = []
+            while True:
+                event_type, data = await asyncio.to_thread(queue.get)
+                if event_type == 'error':
+                    raise data
+                elif event_type == 'done':
+                    break
+                frames.append(np.asarray(data, dtype=np.float32))
+            audio_bytes = self._float_samples_to_bytes(np.concatenate(frames)) if frames else b""
 
             if not audio_bytes:
                 yield None, None
@@ -185,9 +243,6 @@ class PocketTTS(TTS):
                 # Calculate duration for this chunk
                 duration = chunk_len / (self.sample_rate * self.num_channels * (self.bits_per_sample // 8))
 
-                # Sleep to pace the chunks (matches behavior of other TTS providers)
-                await asyncio.sleep(duration)
-
                 # Send header + chunk data
                 yield (header + chunk, duration)
 
@@ -209,22 +264,12 @@ class PocketTTS(TTS):
             yield None, None
             return
 
-        queue = SyncQueue()
-        def generate_frames():
-            try:
-                chunked_iterator = self.client.generate_chunked(text, voice_id)
-                for chunk_result in chunked_iterator:
-                    queue.put(('frame', chunk_result))
-                queue.put(('done', None))
-            except Exception as e:
-                queue.put(('error', e))
-        thread = threading.Thread(target=generate_frames, daemon=True)
-        thread.start()
+        queue = self._generate(text, voice_id, chunked=True)
         try:
             # Accumulate samples for batching into network-friendly chunks
-            accumulated_samples = []
             target_chunk_samples = 18000  # 0.75 seconds at 24kHz - network chunk size
             initial_buffer_samples = 12000  # 0.5 seconds at 24kHz - initial buffer to prevent clipping
+            accumulated_samples = PCMRingBuffer(capacity=target_chunk_samples * 2)
             has_initial_buffer = False
             chunk_count = 0
 
@@ -235,9 +280,8 @@ class PocketTTS(TTS):
                 elif event_type == 'done':
                     break
                 elif event_type == 'frame':
-                    chunk_result = data
-                    # chunk_result is a list of floats for one Mimi frame
-                    accumulated_samples.extend(chunk_result)
+                    # data is a list of floats for one Mimi frame
+                    accumulated_samples.write(data)
 
                     # Build initial buffer before sending first chunk
                     if not has_initial_buffer:
@@ -248,8 +292,7 @@ class PocketTTS(TTS):
 
                     # Send chunk when we have enough samples
                     while len(accumulated_samples) >= target_chunk_samples:
-                        frame_samples = accumulated_samples[:target_chunk_samples]
-                        accumulated_samples = accumulated_samples[target_chunk_samples:]
+                        frame_samples = accumulated_samples.read(target_chunk_samples)
 
                         # Convert to 16-bit PCM bytes
                         chunk_bytes = self._float_samples_to_bytes(frame_samples)
@@ -271,11 +314,12 @@ class PocketTTS(TTS):
                         yield (header + chunk_bytes, duration)
 
             # Send any remaining samples
-            if accumulated_samples:
+            if len(accumulated_samples):
                 # If we never got enough for initial buffer, send everything as one chunk (short text)
                 if not has_initial_buffer:
                     logger.debug(f"Chunked TTS: Short text, sending {len(accumulated_samples)} samples without buffering")
-                chunk_bytes = self._float_samples_to_bytes(accumulated_samples)
+                frame_samples = accumulated_samples.read(len(accumulated_samples))
+                chunk_bytes = self._float_samples_to_bytes(frame_samples)
                 header = create_wav_header(
                     self.sample_rate,
                     self.bits_per_sample,
@@ -283,10 +327,10 @@ class PocketTTS(TTS):
                     len(chunk_bytes)
                 )
 
-                duration = len(accumulated_samples) / self.sample_rate
+                duration = len(frame_samples) / self.sample_rate
                 chunk_count += 1
 
-                logger.debug(f"Chunked TTS: Sending final chunk {chunk_count}, {len(accumulated_samples)} samples, {len(chunk_bytes)} bytes, {duration:.3f}s")
+                logger.debug(f"Chunked TTS: Sending final chunk {chunk_count}, {len(frame_samples)} samples, {len(chunk_bytes)} bytes, {duration:.3f}s")
                 yield (header + chunk_bytes, duration)
             logger.info(f"Chunked TTS: Finished streaming {chunk_count} chunks for '{text[:50]}...'")
 
@@ -416,8 +460,9 @@ class PocketTTS(TTS):
             return
 
         async def run():
+            prompt = await asyncio.to_thread(self.voice_prompts.resolve, voice_id)
             audio_samples = await asyncio.to_thread(
-                self.client.generate, text, voice_id
+                self.client.generate, text, prompt
             )
             audio_bytes = self._float_samples_to_bytes(audio_samples)
 
@@ -0,0 +1,91 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from custom_logger.logger import logger
+
+PREPARED_DIR = ".prepared"
+
+
+class VoicePromptCache:
+    """Size-bounded LRU of prepared Pocket TTS voice prompts, keyed by path and mtime.
+
+    The bindings only accept a voice prompt by path, so the expensive part we can avoid is re-encoding
+    raw `.wav` prompts on every message. Those get encoded to `.safetensors` once and the prepared path is
+    kept here. `.safetensors` prompts are read once on first use so they're warm in the OS file cache.
+    """
+
+    def __init__(self, model_getter, max_size: int = 16):
+        self._model_getter = model_getter
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, float], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(self, voice_id: str) -> str:
+        """Return the prepared voice prompt path for `voice_id`, preparing it if needed. Blocking."""
+        if not voice_id or not os.path.exists(voice_id):
+            return voice_id
+        path = os.path.abspath(voice_id)
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared:
+                self._entries.move_to_end(key)
+                return prepared
+
+        prepared = self._prepare(path, key[1])
+
+        with self._lock:
+            self._entries[key] = prepared
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def _prepare(self, path: str, mtime: float) -> str:
+        if not path.lower().endswith(".wav"):
+            with open(path, "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+            return path
+
+        model = self._model_getter()
+        if not model:
+            return path
+        digest = hashlib.sha1(f"{path}:{mtime}".encode("utf-8")).hexdigest()[:12]
+        prepared_dir = os.path.join(os.path.dirname(path), PREPARED_DIR)
+        prepared = os.path.join(prepared_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest}.safetensors")
+        if not os.path.exists(prepared):
+            os.makedirs(prepared_dir, exist_ok=True)
+            try:
+                model.save_audio_as_voice_prompt(path, prepared)
+                logger.info(f"Prepared Pocket TTS voice prompt for {path}")
+            except Exception as e:
+                logger.warning(f"Could not prepare Pocket TTS voice prompt for {path}: {e}")
+                return path
+        return prepared
+
+    def preload(self, voice_ids: list[str]):
+        """Prepare voices in the background."""
+        voice_ids = [v for v in voice_ids if v]
+        if not voice_ids:
+            return
+
+        def _run():
+            for voice_id in voice_ids:
+                try:
+                    self.resolve(voice_id)
+                except Exception as e:
+                    logger.warning(f"Could not preload Pocket TTS voice {voice_id}: {e}")
+            logger.debug(f"Preloaded {len(voice_ids)} Pocket TTS voice(s)")
+
+        thread = threading.Thread(target=_run, name="PocketVoicePreload", daemon=True)
+        thread.start()
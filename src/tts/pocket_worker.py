@@ -0,0 +1,118 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing.connection import Connection
+from queue import Queue as SyncQueue
+
+import numpy as np
+
+from pocket_worker_entry import run_worker, load_model
+from custom_logger.logger import logger
+
+# Pocket TTS can synthesize in separate worker processes so long generations don't compete for the GIL
+# with the UI, server and chat. Workers are spawned with multiprocessing (main.py calls freeze_support for
+# frozen builds) and run pocket_worker_entry, which skips the app's bootstrap. Each one gets its end of a
+# Pipe, loads the model once and streams frames back. The pool closes its copy of the worker's end, so a
+# worker that dies at any point shows up as EOFError on recv instead of a thread waiting forever.
+
+
+class PocketWorkerPool:
+
+    def __init__(self, model_path: str, workers: int):
+        self.model_path = model_path
+        self._jobs = SyncQueue()
+        self._processes: list[multiprocessing.Process] = []
+        self._threads: list[threading.Thread] = []
+        self._alive = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        debug = os.environ.get("TCDND_DEBUG_MODE") == "1"
+
+        context = multiprocessing.get_context("spawn")
+        for i in range(workers):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(target=run_worker, args=(worker_conn, debug), name=f"PocketWorker-{i}", daemon=True)
+            process.start()
+            worker_conn.close()
+            self._processes.append(process)
+            thread = threading.Thread(target=self._serve, args=(conn,), name=f"PocketWorker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {workers} Pocket TTS worker process(es)")
+
+    @property
+    def available(self) -> bool:
+        return self._alive > 0 and not self._closed
+
+    def _serve(self, conn: Connection):
+        try:
+            conn.send(("load", self.model_path))
+            status, data = conn.recv()
+            if status != "ready":
+                logger.error(f"Pocket TTS worker failed to load model: {data}")
+                conn.send(("stop",))
+                conn.close()
+                return
+        except (EOFError, OSError) as e:
+            logger.error(f"Pocket TTS worker failed to start: {e}")
+            conn.close()
+            return
+
+        with self._lock:
+            self._alive += 1
+        logger.debug(f"Pocket TTS worker {threading.current_thread().name} ready")
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    conn.send(("stop",))
+                    break
+                command, text, voice_id, events = job
+                try:
+                    conn.send((command, text, voice_id))
+                    while True:
+                        event_type, data = conn.recv()
+                        if event_type == "frame":
+                            events.put(("frame", np.frombuffer(data, dtype=np.float32)))
+                        elif event_type == "done":
+                            events.put(("done", None))
+                            break
+                        else:
+                            events.put(("error", RuntimeError(data)))
+                            break
+                except (EOFError, OSError) as e:
+                    logger.error(f"Pocket TTS worker {threading.current_thread().name} exited: {e}")
+                    events.put(("error", e))
+                    break
+        finally:
+            conn.close()
+            with self._lock:
+                self._alive -= 1
+                if not self._alive:
+                    # Nobody left to pick these up. Under the lock, so submit can't add one after this
+                    while not self._jobs.empty():
+                        job = self._jobs.get_nowait()
+                        if job is not None:
+                            job[3].put(("error", RuntimeError("No Pocket TTS workers available")))
+
+    def submit(self, text: str, voice_id: str, chunked: bool = True) -> SyncQueue | None:
+        """Queue a synthesis job. Returns a queue of ('frame', samples) / ('done', None) / ('error', e) events."""
+        events = SyncQueue()
+        with self._lock:
+            if not self.available:
+                return None
+            self._jobs.put(("generate_chunked" if chunked else "generate", text, voice_id, events))
+        return events
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
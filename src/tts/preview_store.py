@@ -0,0 +1,145 @@
+import os
+import mmap
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterator
+
+from helpers.instance_manager import get_config
+from helpers.utils import try_get_cache
+from custom_logger.logger import logger
+
+# Voice preview audio, one file per voice: a flag byte then the audio, zlib compressed if that helps.
+# Kept out of diskcache so the total size has a hard budget instead of only a time based expiry.
+
+_RAW = b"R"
+_ZLIB = b"Z"
+_SUFFIX = ".preview"
+_READ_SIZE = 64 * 1024
+_LEGACY_PREFIXES = ("11l.preview.", "se.preview.")
+_LEGACY_PURGED = "preview.legacy_purged"
+
+
+class PreviewStore:
+    """Byte-budgeted store of preview clips, evicting the least recently played first."""
+
+    def __init__(self, directory: str, budget_bytes: int):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()  # filename -> size, oldest first
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + _SUFFIX
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, key: str) -> Iterator[bytes] | None:
+        name = self._filename(key)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(name)
+            try:
+                os.utime(self._path(name))
+                # Opened here, not lazily, so eviction can't remove it before playback starts
+                with open(self._path(name), "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not open preview audio for `{key}`: {e}")
+                self._forget(name)
+                return None
+        return self._read(mm)
+
+    @staticmethod
+    def _read(mm: mmap.mmap) -> Iterator[bytes]:
+        try:
+            flag = mm[:1]
+            decompressor = zlib.decompressobj() if flag == _ZLIB else None
+            for offset in range(1, len(mm), _READ_SIZE):
+                data = mm[offset : offset + _READ_SIZE]
+                yield decompressor.decompress(data) if decompressor else data
+            if decompressor:
+                yield decompressor.flush()
+        finally:
+            mm.close()
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        compressed = zlib.compress(audio, 6)
+        blob = _ZLIB + compressed if len(compressed) < len(audio) else _RAW + audio
+
+        name = self._filename(key)
+        path = self._path(name)
+        with self._lock:
+            try:
+                with open(path + ".tmp", "wb") as f:
+                    f.write(blob)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                logger.warning(f"Could not store preview audio for `{key}`: {e}")
+                return
+            self._size -= self._entries.pop(name, 0)
+            self._entries[name] = len(blob)
+            self._size += len(blob)
+            self._evict()
+
+    def _forget(self, name: str):
+        self._size -= self._entries.pop(name, 0)
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            # Still being played (Windows), picked up again and evicted on a later start
+            pass
+
+    def _evict(self):
+        while self._size > self.budget_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            self._forget(name)
+            logger.debug(f"Evicted preview audio {name}, store is {self._size} bytes")
+
+
+def _purge_legacy_previews():
+    # Previews used to be pickled chunk lists in the default cache. Scanning every key is slow on a big cache,
+    # so it's done once and marked
+    cache = try_get_cache("default")
+    if cache is None or cache.get(key=_LEGACY_PURGED, default=False):
+        return
+    for key in list(cache.iterkeys()):
+        if isinstance(key, str) and key.startswith(_LEGACY_PREFIXES):
+            cache.delete(key)
+    cache.set(key=_LEGACY_PURGED, value=True)
+
+
+@lru_cache(maxsize=None)
+def get_preview_store() -> PreviewStore | None:
+    config = get_config(name="default")
+    if not config.cache_enabled or not config.has_option(section="CACHE", option="directory"):
+        return None
+    _purge_legacy_previews()
+    return PreviewStore(
+        directory=os.path.join(config.get(section="CACHE", option="directory"), "previews"),
+        budget_bytes=config.getint(section="CACHE", option="preview_cache_size_mb", fallback=64) * 1024 * 1024,
+    )
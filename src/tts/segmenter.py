@@ -0,0 +1,62 @@
+import re
+
+# Splits chat messages into sentence sized pieces so the first one can play while the rest synthesize
+
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+|\s+(?=[–—-]\s)")
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "lt.", "sgt.", "capt."}
+
+
+def _split_sentences(text: str) -> list[str]:
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence = text[start : match.end()].strip()
+        words = sentence.split()
+        # Abbreviations and speech tags ("Who goes there?" he asks.) don't end the sentence
+        if words[-1].lower() in _ABBREVIATIONS or text[match.end() : match.end() + 1].islower():
+            continue
+        sentences.append(sentence)
+        start = match.end()
+    sentences.append(text[start:].strip())
+    return [s for s in sentences if s]
+
+
+def _split_long(sentence: str, max_chars: int) -> list[str]:
+    """Break an overly long sentence at clause boundaries, then at spaces."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    for clause in (c.strip() for c in _CLAUSE_END.split(sentence)):
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            pieces.append(clause)
+    return pieces
+
+
+def split_segments(text: str, max_chars: int = 200, min_chars: int = 20) -> list[str]:
+    """Split `text` at sentence, then clause, boundaries.
+
+    Pieces shorter than `min_chars` are joined onto the next one while the result stays under `max_chars`,
+    so short interjections don't become their own request with a choppy pause after them.
+    """
+    text = " ".join(text.split())
+    if len(text) <= min_chars:
+        return [text] if text else []
+
+    pieces = []
+    for sentence in _split_sentences(text):
+        pieces.extend(_split_long(sentence, max_chars))
+
+    segments = []
+    for piece in pieces:
+        if segments and len(segments[-1]) < min_chars and len(segments[-1]) + len(piece) + 1 <= max_chars:
+            segments[-1] = f"{segments[-1]} {piece}"
+        else:
+            segments.append(piece)
+    return segments
@@ -1,21 +1,25 @@
 import asyncio
 import threading
 import io
-import requests  # could do aiohttp if needed
+import httpx
 
 from elevenlabs import play
 from pydub import AudioSegment
 
 from helpers.instance_manager import get_config
-from helpers.utils import try_get_cache
 from helpers.utils import run_coroutine_sync
+from helpers.event import queue_on_main_loop
 from helpers.constants import TTS_SOURCE
 
-from tts.tts import TTS
+from tts.tts import TTS, create_wav_header
+from tts.loudness import LoudnessNormalizer
+from tts.pcm import apply_gain
+from tts.voice_catalog import get_voice_catalog
+from tts.preview_store import get_preview_store
 
 from custom_logger.logger import logger
 
-from data.voices import bulk_insert_voices, fetch_voices, get_all_voice_ids
+from data.voices import bulk_insert_voices, get_all_voice_ids
 
 
 class StreamElementsTTS(TTS):
@@ -24,6 +28,9 @@ class StreamElementsTTS(TTS):
     def __init__(self):
         super().__init__()
         self.url = "https://api.streamelements.com/kappa/v2/speech?"
+        self._http: httpx.AsyncClient = None
+        self._http_limit: asyncio.Semaphore = None
+        self._preview_task: asyncio.Task = None
 
         db_voice_ids = run_coroutine_sync(get_all_voice_ids(source=self.source_type))
         if not db_voice_ids:
@@ -39,8 +46,7 @@ class StreamElementsTTS(TTS):
     @property
     def voices(self) -> dict:
         d = {}
-        _voices = run_coroutine_sync(fetch_voices(source=self.source_type))
-        for v in _voices:
+        for v in get_voice_catalog().voices(source=self.source_type):
             d.setdefault(f"{v.name}", v.uid)
         return d
 
@@ -58,74 +64,132 @@ class StreamElementsTTS(TTS):
             return f"se.{base_voice}"
         return None
 
-    def audio_stream_generator(self, text="Hello World!", voice_id: str | None = None):
-        _initial = io.BytesIO()
+    def _get_http(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # Created lazily so they bind to the running loop. Keeps connections alive between messages.
+        if self._http is None:
+            config = get_config(name="default")
+            concurrency = max(1, config.getint(section="STREAMELEMENTS", option="max_concurrency", fallback=4))
+            self._http = httpx.AsyncClient(
+                timeout=30,
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            )
+            self._http_limit = asyncio.Semaphore(concurrency)
+        return self._http, self._http_limit
+
+    @staticmethod
+    def _pcm_output() -> bool:
+        config = get_config(name="default")
+        return config.getboolean(section="STREAMELEMENTS", option="pcm_output", fallback=True)
+
+    @staticmethod
+    def _boost_db() -> float:
+        config = get_config(name="default")
+        return config.getfloat(section="STREAMELEMENTS", option="boost_db", fallback=6.2)
+
+    def _pcm_boost_db(self) -> float:
+        # PCM output is leveled to the loudness target when normalization is on, a fixed boost on top of that
+        # would only be undone, after it may have clipped. The boost is for when nothing else levels it
+        return 0.0 if LoudnessNormalizer.enabled() else self._boost_db()
+
+    def _decode_pcm(self, content: bytes) -> tuple[bytes, int]:
+        # Comes back as mp3/id3 instead of wav/riff. Decode once and boost in the PCM domain, skips the mp3 re-encode
+        audio = AudioSegment.from_file(io.BytesIO(content), format="mp3")
+        audio = audio.set_channels(self.num_channels).set_sample_width(self.bits_per_sample // 8)
+        return apply_gain(audio.raw_data, self._pcm_boost_db()), audio.frame_rate
+
+    def _process_audio(self, content: bytes) -> tuple[bytes, float]:
+        # mp3 output can't go through loudness normalization, it gets the boost instead. The duration comes
+        # from the same decode
         output = io.BytesIO()
+        audio = AudioSegment.from_file(io.BytesIO(content), format="mp3")
+        boosted = audio + self._boost_db()  # dB
+        boosted.export(output, format="mp3")
+        return output.getvalue(), audio.duration_seconds
 
-        res = requests.get(self.url, {"voice": self.get_se_voice(voice_id), "text": text}, timeout=30)
-        # Comes back as mp3/id3 instead of wav/riff
+    async def audio_stream_generator(self, text="Hello World!", voice_id: str | None = None) -> io.BytesIO:
+        # The whole clip at once, for previews. Fetched with the same pooled client as synthesis
+        content = await self.fetch_audio(text, voice_id)
+        if not content:
+            return io.BytesIO()
+        if self._pcm_output():
+            pcm, sample_rate = await asyncio.to_thread(self._decode_pcm, content)
+            return io.BytesIO(create_wav_header(sample_rate, self.bits_per_sample, self.num_channels, len(pcm)) + pcm)
+        output, _ = await asyncio.to_thread(self._process_audio, content)
+        return io.BytesIO(output)
 
+    async def fetch_audio(self, text="Hello World!", voice_id: str | None = None) -> bytes:
+        client, limit = self._get_http()
+        async with limit:
+            res = await client.get(self.url, params={"voice": self.get_se_voice(voice_id), "text": text})
         if res.status_code == 200:
-            _initial.write(res.content)
-        else:
-            logger.error(f"Could not request TTS from StreamElements. Error: {res.content}")
-        _initial.seek(0)
-        audio = AudioSegment.from_file(_initial, format="mp3")
+            return res.content
+        logger.error(f"Could not request TTS from StreamElements. Error: {res.content}")
+        return b""
 
-        config = get_config(name="default")
-        boosted = audio + config.getfloat(section="STREAMELEMENTS", option="boost_db", fallback=6.2)  # dB
-        boosted.export(output, format="mp3")
-        output.seek(0)
-        return output
+    def cache_params(self) -> tuple:
+        pcm_output = self._pcm_output()
+        return super().cache_params() + (self._pcm_boost_db() if pcm_output else self._boost_db(), pcm_output)
 
     async def get_stream(self, text="Hello World!", voice_id: str | None = None):
-        output = self.audio_stream_generator(text, voice_id)
+        content = await self.fetch_audio(text, voice_id)
+        if not content:
+            return
+        # pydub runs ffmpeg for decoding (and encoding), keep that off the event loop
+        if self._pcm_output():
+            pcm, sample_rate = await asyncio.to_thread(self._decode_pcm, content)
+            bytes_per_second = sample_rate * self.num_channels * (self.bits_per_sample // 8)
+            chunk_size = self.max_chunk_size
+            for offset in range(0, len(pcm), chunk_size):
+                chunk = pcm[offset : offset + chunk_size]
+                duration = len(chunk) / bytes_per_second
+                yield (create_wav_header(sample_rate, self.bits_per_sample, self.num_channels, len(chunk)) + chunk, duration)
+            return
 
-        chunk_size = min(self.max_chunk_size, len(output.getvalue()))
-        chunk = output.read(chunk_size)
+        # One chunk, the mp3 can't be split and decoded on arbitrary bytes
+        output, duration = await asyncio.to_thread(self._process_audio, content)
+        yield (output, duration)
 
-        while chunk:
-            duration = len(chunk) / (self.sample_rate * self.num_channels * (self.bits_per_sample // 8))
-            await asyncio.sleep(duration)
-            yield (chunk, duration)
-            chunk = output.read(chunk_size)
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     def test_speak(self, text: str = "Hello there. How are you?", voice_id: str | None = None):
         key = f"se.preview.{voice_id}"
         audio = None
-        cache = try_get_cache("default")
-        if cache:
-            audio_l = cache.get(key=key, default=None)
-            if audio_l:
-                audio = iter(audio_l)
+        store = get_preview_store()
+        if store:
+            audio = store.get(key)
+            if audio:
                 logger.debug(f"Fetched cached preview audio for `{voice_id}`")
         if not audio:
-
-            def generate_and_play():
-                audio = list(self.audio_stream_generator(text=text, voice_id=voice_id))
-                config = get_config(name="default")
-
-                if cache:
-                    cache.set(
-                        key=key,
-                        expire=config.getint(
-                            section="CACHE",
-                            option="tts_cache_expiry",
-                            fallback=7 * 24 * 60 * 60 * 4 * 3,
-                        ),
-                        value=list(audio),
-                    )
-                audio = iter(audio)
-                play(audio)
-
-            thread = threading.Thread(target=generate_and_play)
-            thread.daemon = True
-            thread.start()
+            # The pooled client belongs to the app's main loop, the preview is fetched from there
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None or threading.current_thread() is not threading.main_thread():
+                queue_on_main_loop(self.test_speak, text, voice_id)
+                return
+            self._preview_task = loop.create_task(self._generate_and_play(key, text, voice_id))
             return
         thread = threading.Thread(target=play, args=(audio,))
         thread.daemon = True
         thread.start()
 
+    async def _generate_and_play(self, key: str, text: str, voice_id: str | None):
+        try:
+            audio = (await self.audio_stream_generator(text=text, voice_id=voice_id)).getvalue()
+        except Exception as e:
+            logger.error(f"Could not request preview from StreamElements: {e}")
+            return
+        if not audio:
+            return
+        store = get_preview_store()
+        if store:
+            store.put(key, audio)
+        await asyncio.to_thread(play, audio)
+
 
 # To set your voice to one of these, you need to prefix it with 'se.' to get its voice_id. Ex: se.Brian
 se_voices = [
@@ -1,6 +1,11 @@
 from logging import getLogger
+import asyncio
 import struct
 from helpers.constants import TTS_SOURCE
+from helpers.instance_manager import get_config
+from tts.loudness import get_loudness_normalizer
+from tts.segmenter import split_segments
+from tts.utterance_cache import get_utterance_cache
 
 logger = getLogger("ChatDND")
 
@@ -36,6 +41,8 @@ class TTS:
     bits_per_sample = 16
     num_channels = 1
     max_chunk_size = 1024 * 8 * 8 * 2 * 2  # 256kb
+    # Engines that already stream audio as it's generated turn this off, splitting would only cost prosody
+    segment_text = True
 
     def __init__(self):
         logger.debug(f"TTS Instance created of type: {self.source_type}")
@@ -46,6 +53,84 @@ class TTS:
     async def get_stream(self):
         yield (None, 0)
 
+    async def aclose(self):
+        # Release connections held by the engine. Called once on shutdown, from the app's loop
+        pass
+
+    def cache_params(self) -> tuple:
+        # Anything that changes the synthesized audio besides the voice and text
+        return (self.sample_rate, self.bits_per_sample, self.num_channels)
+
+    async def stream(self, text="Hello World!", voice_id: str = ""):
+        # Leveled to the loudness target for the voice. The cache keeps the audio as the engine made it
+        normalizer = get_loudness_normalizer()
+        async for item in normalizer.normalize(self.source_type, voice_id, self._stream_cached(text, voice_id)):
+            yield item
+
+    async def _stream_cached(self, text="Hello World!", voice_id: str = ""):
+        # Cached front for get_stream. Chunks are yielded as soon as they exist, pacing is left to the server
+        utterance_cache = get_utterance_cache()
+        key = utterance_cache.make_key(self.source_type, voice_id, text, self.cache_params())
+        chunks = utterance_cache.get(key)
+        if chunks:
+            for chunk, duration in chunks:
+                yield (chunk, duration)
+            return
+
+        chunks = []
+        complete = True
+        async for chunk, duration in self.get_stream(text, voice_id):
+            if chunk is None:
+                complete = False
+            else:
+                chunks.append((chunk, duration))
+            yield (chunk, duration)
+        if complete:
+            utterance_cache.set(key, chunks)
+
+    async def stream_segments(self, text="Hello World!", voice_id: str = ""):
+        # Splits long messages into sentences, synthesizing the next ones while the first is streamed.
+        # Every segment goes through `stream` so each one is cached on its own
+        config = get_config(name="default")
+        segments = [text]
+        if self.segment_text and config.getboolean(section="TTS", option="segment_sentences", fallback=True):
+            segments = split_segments(text, max_chars=config.getint(section="TTS", option="segment_max_chars", fallback=200))
+        if len(segments) <= 1:
+            async for item in self.stream(text, voice_id):
+                yield item
+            return
+
+        lookahead = max(0, config.getint(section="TTS", option="segment_lookahead", fallback=1))
+        queues = [asyncio.Queue() for _ in segments]
+        tasks: list[asyncio.Task] = []
+
+        async def _synthesize(segment: str, queue: asyncio.Queue):
+            try:
+                async for item in self.stream(segment, voice_id):
+                    await queue.put(item)
+            except Exception as e:
+                logger.error(f"Segment synthesis failed for '{segment}': {e}")
+                await queue.put((None, None))
+            finally:
+                await queue.put(None)
+
+        def _start_next():
+            i = len(tasks)
+            if i < len(segments):
+                tasks.append(asyncio.create_task(_synthesize(segments[i], queues[i])))
+
+        try:
+            for _ in range(lookahead + 1):
+                _start_next()
+            for queue in queues:
+                while (item := await queue.get()) is not None:
+                    yield item
+                _start_next()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     def list_voices(self) -> list:
         return []
 
@@ -0,0 +1,76 @@
+import re
+from functools import lru_cache
+
+from diskcache import Cache
+
+from helpers.instance_manager import get_cache, get_config
+from helpers.constants import TTS_SOURCE
+from custom_logger.logger import logger
+
+# Synthesized utterances live in their own diskcache so they get their own size limit and
+# LRU eviction, without pushing twitch users, voices or pfps out of the default cache.
+CACHE_NAME = "tts"
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    if not text:
+        return ""
+    return _whitespace.sub(" ", text).strip()
+
+
+class UtteranceCache:
+
+    def __init__(self, name: str = CACHE_NAME):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self) -> Cache | None:
+        config = get_config("default")
+        if not config.cache_enabled:
+            return None
+        if not config.getboolean(section="CACHE", option="utterance_cache_enabled", fallback=True):
+            return None
+        return get_cache(self.name)
+
+    @staticmethod
+    def make_key(source: TTS_SOURCE, voice_id: str, text: str, params: tuple = ()) -> tuple:
+        return ("utterance", source.value, voice_id or "", normalize_text(text), tuple(params))
+
+    def get(self, key: tuple) -> list[tuple[bytes, float]] | None:
+        cache = self.cache
+        if cache is None:
+            return None
+        chunks = cache.get(key=key, default=None)
+        if chunks:
+            self.hits += 1
+        else:
+            self.misses += 1
+        logger.debug(f"Utterance cache {'hit' if chunks else 'miss'} ({self.hits} hits / {self.misses} misses)")
+        return chunks
+
+    def set(self, key: tuple, chunks: list[tuple[bytes, float]]):
+        cache = self.cache
+        if cache is None or not chunks:
+            return
+        config = get_config("default")
+        cache.set(
+            key=key,
+            expire=config.getint(
+                section="CACHE",
+                option="tts_cache_expiry",
+                fallback=7 * 24 * 60 * 60 * 4 * 3,
+            ),
+            value=chunks,
+        )
+
+    def stats(self) -> tuple[int, int]:
+        return self.hits, self.misses
+
+
+@lru_cache(maxsize=None)
+def get_utterance_cache() -> UtteranceCache:
+    return UtteranceCache()
@@ -0,0 +1,87 @@
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+from helpers.utils import run_coroutine_sync
+from helpers.constants import TTS_SOURCE
+from custom_logger.logger import logger
+
+from chatdnd.events.tts_events import on_voices_changed
+from data.voices import Voice, fetch_voices
+
+
+class CatalogVoice(NamedTuple):
+    name: str
+    uid: str
+    source: str
+
+
+class VoiceCatalog:
+    """Process-wide copy of the voices table, indexed by uid and by source.
+
+    Loaded from the DB once on first use, then kept current from the added/removed voices carried by
+    on_voices_changed, so the engines' `voices` properties never have to query the DB.
+    """
+
+    def __init__(self):
+        self._by_uid: dict[str, CatalogVoice] = {}
+        self._by_source: dict[str, dict[str, CatalogVoice]] = {}
+        self._loaded = False
+        self._pending: list[tuple[list, list]] = []
+        self._lock = threading.Lock()
+        on_voices_changed.addListener(self._on_voices_changed)
+
+    def _add(self, voice: CatalogVoice):
+        self._remove(voice.uid)
+        self._by_uid[voice.uid] = voice
+        self._by_source.setdefault(voice.source, {})[voice.uid] = voice
+
+    def _remove(self, uid: str):
+        voice = self._by_uid.pop(uid, None)
+        if voice:
+            self._by_source.get(voice.source, {}).pop(uid, None)
+
+    def _apply(self, added: list[Voice], removed: list[str]):
+        for uid in removed:
+            self._remove(uid)
+        for v in added:
+            if v:
+                self._add(CatalogVoice(v.name, v.uid, v.source))
+
+    def _on_voices_changed(self, added: list[Voice], removed: list[str]):
+        with self._lock:
+            if self._loaded:
+                self._apply(added, removed)
+            else:
+                # Replayed over the snapshot once it's loaded
+                self._pending.append((added, removed))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        voices = run_coroutine_sync(fetch_voices(limit=None))
+        with self._lock:
+            if self._loaded:
+                return
+            self._apply(voices, [])
+            for added, removed in self._pending:
+                self._apply(added, removed)
+            self._pending.clear()
+            self._loaded = True
+        logger.debug(f"Voice catalog loaded with {len(self._by_uid)} voices")
+
+    def voices(self, source: TTS_SOURCE = None) -> list[CatalogVoice]:
+        self._ensure_loaded()
+        with self._lock:
+            if source is None:
+                return list(self._by_uid.values())
+            return list(self._by_source.get(source.value, {}).values())
+
+    def get(self, uid: str) -> CatalogVoice | None:
+        self._ensure_loaded()
+        return self._by_uid.get(uid)
+
+
+@lru_cache(maxsize=None)
+def get_voice_catalog() -> VoiceCatalog:
+    return VoiceCatalog()
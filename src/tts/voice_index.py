@@ -0,0 +1,73 @@
+import asyncio
+from functools import lru_cache
+
+from tts import wait_for_tts
+from tts.local_engine import friendly_name
+from tts.streamelements_tts import se_voices
+from tts.voice_catalog import get_voice_catalog
+from helpers.constants import TTS_SOURCE
+from custom_logger.logger import logger
+
+from chatdnd.events.tts_events import on_voices_changed, on_tts_ready
+
+
+class VoiceIndex:
+    """In-memory lookup of every known voice for the !voice command.
+
+    Built from the voices table plus each engine's own catalog, keyed by uid, `se.` aliases, local
+    friendly names and case-folded names. Rebuilt lazily after the voices change.
+    """
+
+    def __init__(self):
+        self._index: dict[str, str] = {}
+        self._dirty = True
+        self._lock = asyncio.Lock()
+        on_voices_changed.addListener(self.invalidate)
+        on_tts_ready.addListener(self._on_tts_ready)
+
+    def invalidate(self, *_changes):
+        self._dirty = True
+
+    def _on_tts_ready(self, _source: TTS_SOURCE):
+        # Engine catalogs (local voices) only exist once the engine is up
+        self._dirty = True
+
+    async def rebuild(self):
+        voices = await asyncio.to_thread(get_voice_catalog().voices)
+        index = {}
+
+        # Priority matches the previous lookup order, exact uids first then SE, local then names
+        for v in voices:
+            index.setdefault(v.uid, v.uid)
+        for voice in se_voices:
+            index.setdefault(f"se.{voice}".casefold(), f"se.{voice}")
+        local_tts = await wait_for_tts(TTS_SOURCE.SOURCE_LOCAL)
+        if local_tts:
+            for uid, name in await asyncio.to_thread(local_tts.engine.voices):
+                index.setdefault(friendly_name(name).casefold(), uid)
+        for v in voices:
+            index.setdefault(v.uid.casefold(), v.uid)
+            index.setdefault(v.name.casefold(), v.uid)
+
+        self._index = index
+        logger.debug(f"Voice index rebuilt with {len(index)} keys")
+
+    async def resolve(self, param: str) -> str | None:
+        if not param or not param.strip():
+            return None
+        async with self._lock:
+            if self._dirty:
+                # Clear first, changes during the rebuild mark it dirty again
+                self._dirty = False
+                try:
+                    await self.rebuild()
+                except Exception:
+                    self._dirty = True
+                    raise
+        param = param.strip()
+        return self._index.get(param) or self._index.get(param.casefold())
+
+
+@lru_cache(maxsize=None)
+def get_voice_index() -> VoiceIndex:
+    return VoiceIndex()
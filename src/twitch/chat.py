@@ -18,7 +18,8 @@ from data.member import create_or_get_member, fetch_member, update_tts
 
 from custom_logger.logger import logger
 
-from tts import get_tts
+from tts import wait_for_tts
+from tts.voice_index import get_voice_index
 
 from chatdnd import SessionManager
 from chatdnd.events.ui_events import (
@@ -305,7 +306,7 @@ class ChatController:
         param = param.lower().strip()
         msg = ""
 
-        tts = get_tts(TTS_SOURCE(param))
+        tts = await wait_for_tts(TTS_SOURCE(param))
         msg = None if not tts else tts.voice_list_message()
         if not msg:
             return
@@ -320,15 +321,12 @@ class ChatController:
             )
             return
         param = param.strip()
-        voice_id = ""
 
-        # Try each TTS
-        if param.startswith("se."):
-            voice_id = get_tts(TTS_SOURCE.SOURCE_SE).search_for_voice_by_id(param)
+        # Known voices from every source, then ElevenLabs voices on the account that aren't imported yet
+        voice_id = await get_voice_index().resolve(param)
         if not voice_id:
-            voice_id = get_tts(TTS_SOURCE.SOURCE_LOCAL).get_voice_id_by_friendly_name(param)
-        if not voice_id:
-            voice = get_tts(TTS_SOURCE.SOURCE_11L).search_for_voice_by_id(param)
+            elevenlabs = await wait_for_tts(TTS_SOURCE.SOURCE_11L)
+            voice = elevenlabs.search_for_voice_by_id(param) if elevenlabs else None
             if voice:
                 voice_id = voice.voice_id
 
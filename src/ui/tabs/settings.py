@@ -14,7 +14,7 @@ from helpers.instance_manager import get_config
 from helpers.utils import run_coroutine_sync, check_for_updates, get_resource_path
 from helpers.constants import TTS_SOURCE
 from twitch.utils import TwitchUtils
-from tts import get_tts
+from tts import ready_tts
 from data.voices import delete_voice
 from data.member import remove_tts
 
@@ -37,6 +37,7 @@ from chatdnd.events.tts_events import (
     on_elevenlabs_connect,
     on_elevenlabs_test_speak,
     on_elevenlabs_subscription_update,
+    on_tts_ready,
 )
 
 from ui.widgets.CTkFloatingNotifications import NotifyType
@@ -339,6 +340,8 @@ class SettingsTab:
         el_warning_entry.configure(justify="center")
         el_warning_entry.grid(row=row, column=column, padx=(20, 20), pady=(42, 20))
 
+        self.e11labs_connected = False
+        self.pocket_connected = False
         on_elevenlabs_connect.addListener(self._update_elevenlabs_connection)
         on_elevenlabs_subscription_update.addListener(self._update_elevenlabs_usage)
         request_elevenlabs_connect.trigger()
@@ -404,6 +407,9 @@ class SettingsTab:
         )
         self.preview_pocket_v_button.grid(row=row, column=column, padx=10, pady=(168, 10), sticky="n")
 
+        # Engines connect while they start, the voice lists fill in once they are ready
+        on_tts_ready.addListener(self._on_tts_ready)
+
         # Trigger Pocket TTS connection check after UI is ready
         request_pocket_tts_connect.trigger()
 
@@ -460,8 +466,16 @@ class SettingsTab:
             self.del_v_button.configure(state="disabled")
             self.preview_v_button.configure(state="disabled")
 
+    def _on_tts_ready(self, source: TTS_SOURCE):
+        if source == TTS_SOURCE.SOURCE_11L and self.e11labs_connected:
+            self._update_voice_list()
+        elif source == TTS_SOURCE.SOURCE_POCKET and self.pocket_connected:
+            self._update_pocket_voice_list()
+
     def _import_e11_all(self):
-        client = get_tts(TTS_SOURCE.SOURCE_11L)
+        client = ready_tts(TTS_SOURCE.SOURCE_11L)
+        if client is None:
+            return
         success = client.import_all(True)
         if success:
             self._update_voice_list()
@@ -470,30 +484,36 @@ class SettingsTab:
         option = self.e11_voices.get()
         if not option:
             return
-        client = get_tts(TTS_SOURCE.SOURCE_11L)
-        if uid := client.get_voices()[option]:
+        client = ready_tts(TTS_SOURCE.SOURCE_11L)
+        if client is None:
+            return
+        if uid := client.get_voices().get(option):
             on_elevenlabs_test_speak.trigger(["Hello there. How are you?", uid])
 
     def _update_voice_list(self):
-        client = get_tts(TTS_SOURCE.SOURCE_11L)
+        client = ready_tts(TTS_SOURCE.SOURCE_11L)
         if self.e11_voices.size():
             self.e11_voices.selection_clear()
             while self.e11_voices.size():
                 self.e11_voices.deactivate("END")
                 self.e11_voices.delete("END")
 
-        for k in client.get_voices().keys():  # pylint: disable=consider-iterating-dictionary
-            self.e11_voices.insert("END", option=k)
         self.del_v_button.configure(state="disabled")
         self.preview_v_button.configure(state="disabled")
+        if client is None:
+            return
+        for k in client.get_voices().keys():  # pylint: disable=consider-iterating-dictionary
+            self.e11_voices.insert("END", option=k)
 
     def _delete_voice(self):
         if self.e11_voices.size() <= 1:
             return
         option = self.e11_voices.get()
-        client = get_tts(TTS_SOURCE.SOURCE_11L)
+        client = ready_tts(TTS_SOURCE.SOURCE_11L)
+        if client is None:
+            return
         result1 = None
-        if uid := client.get_voices()[option]:
+        if uid := client.get_voices().get(option):
             run_coroutine_sync(remove_tts(voice_id=uid))
             result1 = run_coroutine_sync(delete_voice(uid=uid, source=TTS_SOURCE.SOURCE_11L))
         if result1:
@@ -592,6 +612,7 @@ class SettingsTab:
             )
 
     def _update_elevenlabs_connection(self, status: bool):
+        self.e11labs_connected = status
         if status:
             self.e11labs_con_label.configure(text="ElevenLabs Connected", text_color="green")
             self._update_voice_list()
@@ -681,6 +702,7 @@ class SettingsTab:
             request_pocket_tts_connect.trigger()
 
     def _update_pocket_tts_connection(self, status: bool):
+        self.pocket_connected = status
         if status:
             self.pocket_model_conf_label.configure(text="Pocket TTS Connected", text_color="green")
             self._update_pocket_voice_list()
@@ -718,8 +740,10 @@ class SettingsTab:
         option = self.pocket_voices.get()
         if not option:
             return
-        client = get_tts(TTS_SOURCE.SOURCE_POCKET)
-        if uid := client.get_voices()[option]:
+        client = ready_tts(TTS_SOURCE.SOURCE_POCKET)
+        if client is None:
+            return
+        if uid := client.get_voices().get(option):
             from chatdnd.events.tts_events import on_pocket_tts_test_speak
             on_pocket_tts_test_speak.trigger([text, uid])
 
@@ -727,25 +751,29 @@ class SettingsTab:
         AddPocketVoiceCard(self._update_pocket_voice_list)
 
     def _update_pocket_voice_list(self):
-        client = get_tts(TTS_SOURCE.SOURCE_POCKET)
+        client = ready_tts(TTS_SOURCE.SOURCE_POCKET)
         if self.pocket_voices.size():
             self.pocket_voices.selection_clear()
             while self.pocket_voices.size():
                 self.pocket_voices.deactivate("END")
                 self.pocket_voices.delete("END")
 
-        for k in client.get_voices().keys():  # pylint: disable=consider-iterating-dictionary
-            self.pocket_voices.insert("END", option=k)
         self.del_pocket_v_button.configure(state="disabled")
         self.preview_pocket_v_button.configure(state="disabled")
+        if client is None:
+            return
+        for k in client.get_voices().keys():  # pylint: disable=consider-iterating-dictionary
+            self.pocket_voices.insert("END", option=k)
     
     def _delete_pocket_voice(self):
         if self.pocket_voices.size() <= 1:
             return
         option = self.pocket_voices.get()
-        client = get_tts(TTS_SOURCE.SOURCE_POCKET)
+        client = ready_tts(TTS_SOURCE.SOURCE_POCKET)
+        if client is None:
+            return
         result1 = None
-        if uid := client.get_voices()[option]:
+        if uid := client.get_voices().get(option):
             run_coroutine_sync(remove_tts(voice_id=uid))
             result1 = run_coroutine_sync(delete_voice(uid=uid, source=TTS_SOURCE.SOURCE_POCKET))
         if result1:
@@ -785,7 +813,11 @@ class AddVoiceCard(ctk.CTkToplevel):
         self.save_button.pack(pady=10)
 
     def save_changes(self):
-        elvoice = get_tts(TTS_SOURCE.SOURCE_11L).get_voice_object(voice_id=self.voice_id_var.get(), run_sync_always=True)
+        client = ready_tts(TTS_SOURCE.SOURCE_11L)
+        if not client:
+            self.label_warn.configure(text="ElevenLabs not available!")
+            return
+        elvoice = client.get_voice_object(voice_id=self.voice_id_var.get(), run_sync_always=True)
         if elvoice:
             self.close_popup()
         else:
@@ -859,7 +891,7 @@ class AddPocketVoiceCard(ctk.CTkToplevel):
         if not filename:
             self.label_warn.configure(text="Please pick a WAV file!")
             return
-        client = get_tts(TTS_SOURCE.SOURCE_POCKET)
+        client = ready_tts(TTS_SOURCE.SOURCE_POCKET)
         if not client:
             self.label_warn.configure(text="Pocket TTS not available!")
             return
@@ -1,20 +1,19 @@
 import asyncio
-from io import BytesIO
 
 import customtkinter as ctk
-import requests
-from PIL import Image
 
 from custom_logger.logger import logger
 from data import Member
 from data.member import create_or_get_member, fetch_member, set_member_blacklist, update_tts, delete_member
 from helpers.constants import TTS_SOURCE
 from helpers.instance_manager import get_config
-from helpers.utils import run_coroutine_sync, try_get_cache
-from tts import get_tts
+from helpers.pfp_store import get_pfp_store
+from helpers.utils import run_coroutine_sync
+from tts import ready_tts, tts_ready
 from chatdnd.events.chat_events import chat_on_party_modify
 from chatdnd.events.ui_events import ui_refresh_user, ui_request_member_refresh, on_external_member_change
 from chatdnd.events.session_events import session_refresh_member
+from chatdnd.events.tts_events import on_tts_ready
 from twitch.chat import ChatController
 from ui.widgets.CTkPopupMenu.custom_popupmenu import CTkContextMenu, ContextMenuTypes
 from ui.widgets.CTkScrollableDropdown.ctk_scrollable_dropdown import CTkScrollableDropdown
@@ -110,36 +109,21 @@ class MemberCard(ctk.CTkFrame):
         asyncio.create_task(delete_member(self.member))
         on_external_member_change.trigger()
 
-    def get_pfp_url_cache(self, url):
-        response = None
-        key = f"{url}.member.pfp"
-
-        cache = try_get_cache('default')
-        if cache:
-            response = cache.get(key=key, default=None)
-            logger.debug(f"Fetched {key} from cache")
-            if response:
-                return response
-
-        response = requests.get(url, timeout=10)
-        if response and cache:
-            config = get_config('default')
-            cache.set(
-                key=key, expire=config.getint(section="CACHE", option="pfp_cache_expiry", fallback=7 * 24 * 60 * 60 * 2), value=response
-            )
-        return response
-
     def setup_pfp(self):
         if not self.winfo_exists():
             return
-        try:
-            url = self.member.pfp_url
-            response = self.get_pfp_url_cache(url)
-            img_data = response.content
-            img = Image.open(BytesIO(img_data))
+        # Shared with the overlay's /pfp route, downloaded and resized once per member and size. The download
+        # can take seconds, so it runs off the Tk thread and the picture is filled in when it's done
+        task = asyncio.create_task(asyncio.to_thread(get_pfp_store().image, self.member.pfp_url, self.width))
+        task.add_done_callback(self._show_pfp)
 
-            resize_method = Image.Resampling.LANCZOS
-            img = img.resize((self.width, self.height), resize_method)
+    def _show_pfp(self, task: asyncio.Task):
+        if task.cancelled() or not self.winfo_exists():
+            return
+        try:
+            img = task.result()
+            if img is None:
+                raise ValueError("no profile picture")
 
             self.bg_image = ctk.CTkImage(img, img, (self.width, self.width))
 
@@ -231,22 +215,11 @@ class MemberEditCard(ctk.CTkToplevel):
 
         )
 
-        voices = get_tts(TTS_SOURCE(current_source)).get_voices()
-
         self.tts_drop_frame = CTkScrollableDropdown(self.tts_source_dropdown, values=valid_sources, command=self._update_voicelist, height=300, width=160, alpha=1, button_height=30)
-        self.tts_options = list(voices.keys())
         self.tts_dropdown = ctk.CTkOptionMenu(self)
 
         self.tts_voice_drop_frame = CTkScrollableDropdown(self.tts_dropdown, values=self.tts_options, width=425, height=385, alpha=1, justify="left", button_height=30)
 
-        if self.member.preferred_tts_uid and self.member.preferred_tts_uid in voices.values():
-            for k, v in voices.items():
-                if v == self.member.preferred_tts_uid:
-                    self.tts_dropdown.set(value=k)
-                    break
-        else:
-            self.tts_dropdown.set(value=self.tts_options[0])
-
         self.tts_source_dropdown.pack(padx=10, pady=(5, 20))
         self.tts_dropdown.pack(padx=10, pady=(5, 20))
 
@@ -256,14 +229,30 @@ class MemberEditCard(ctk.CTkToplevel):
         self.save_button = ctk.CTkButton(self, text="Save", command=self.save_changes)
         self.save_button.pack(pady=10)
 
+        self._show_voices(current_source)
+        # Engines start in the background, the voice list fills in once the selected one is up
+        on_tts_ready.addListener(self._on_tts_ready)
+
         num_sessions_label = ctk.CTkLabel(self, text=f"Number of Sessions: {self.member.num_sessions}")
         num_sessions_label.pack(pady=(20, 5))
 
-    def _update_voicelist(self, choice):
-        voices = get_tts(TTS_SOURCE(choice)).get_voices()
+    def _show_voices(self, source: str):
+        tts = ready_tts(TTS_SOURCE(source))
+        voices = tts.get_voices() if tts else {}
         self.tts_options = list(voices.keys())
         self.tts_voice_drop_frame.configure(values=self.tts_options)
-        if self.member.preferred_tts_uid and self.member.preferred_tts_uid in voices.values():
+
+        state = "normal" if self.tts_options else "disabled"
+        for widget in (self.tts_dropdown, self.test_button, self.save_button):
+            widget.configure(state=state)
+
+        if not tts_ready(TTS_SOURCE(source)):
+            self.tts_dropdown.set(value="Loading voices...")
+        elif tts is None:
+            self.tts_dropdown.set(value=f"{source} is unavailable")
+        elif not self.tts_options:
+            self.tts_dropdown.set(value="No voices")
+        elif self.member.preferred_tts_uid and self.member.preferred_tts_uid in voices.values():
             for k, v in voices.items():
                 if v == self.member.preferred_tts_uid:
                     self.tts_dropdown.set(value=k)
@@ -271,22 +260,34 @@ class MemberEditCard(ctk.CTkToplevel):
         else:
             self.tts_dropdown.set(value=self.tts_options[0])
 
+    def _on_tts_ready(self, source: TTS_SOURCE):
+        if source.value == self.tts_source_var.get():
+            self._show_voices(source.value)
+
+    def _update_voicelist(self, choice):
+        self._show_voices(choice)
         self.tts_source_dropdown.set(value=choice)
         self.tts_source_var.set(value=choice)
 
     def test_tts(self):
-        tts = get_tts(TTS_SOURCE(self.tts_source_var.get()))
-        voice_id = tts.get_voices()[self.tts_dropdown.get()]
-        tts.test_speak(voice_id=voice_id)
+        tts = ready_tts(TTS_SOURCE(self.tts_source_var.get()))
+        if tts is None:
+            return
+        voice_id = tts.get_voices().get(self.tts_dropdown.get())
+        if voice_id:
+            tts.test_speak(voice_id=voice_id)
 
     def save_changes(self):
         new_tts = self.tts_dropdown.get()
-        voices = get_tts(TTS_SOURCE(self.tts_source_var.get())).get_voices()
-        voice_id = voices[new_tts]
+        tts = ready_tts(TTS_SOURCE(self.tts_source_var.get()))
+        voice_id = tts.get_voices().get(new_tts) if tts else None
+        if not voice_id:
+            return
 
         asyncio.create_task(update_tts(self.member, voice_id))
         logger.info(f"Updated preferred_tts for {self.member.name} to {new_tts}")
 
     def close_popup(self):
+        on_tts_ready.removeListener(self._on_tts_ready)
         MemberEditCard.open_popup = None
         self.destroy()
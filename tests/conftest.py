@@ -0,0 +1,34 @@
+import os
+import sys
+import asyncio
+import tempfile
+
+# The app runs from src/ with its packages as top-level imports
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+os.environ.setdefault("TCDND_DEBUG_MODE", "0")
+
+
+def pytest_configure(config):
+    # A throwaway config.ini, default cache and database, like main.py sets up at startup. Done
+    # before collection, importing the engines already touches them
+    root = tempfile.mkdtemp(prefix="tcdnd-tests-")
+    # The database and logs live in the working directory
+    os.chdir(root)
+
+    # custom_logger sends stdout and stderr to the log on import, pytest still needs them
+    stdout, stderr = sys.stdout, sys.stderr
+    from helpers.instance_manager import init_cache, init_config  # pylint: disable=import-outside-toplevel
+
+    sys.stdout, sys.stderr = stdout, stderr
+
+    init_config(name="default", path=os.path.join(root, "config.ini"))
+    init_cache(name="default", path=os.path.join(root, "cache"))
+
+    import data  # noqa: F401 pylint: disable=unused-import,import-outside-toplevel
+    from db import initialize_database  # pylint: disable=import-outside-toplevel
+
+    # Not asyncio.run, it would leave no current loop for the events created while collecting
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(initialize_database())
+    loop.close()
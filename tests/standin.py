@@ -0,0 +1,20 @@
+import os
+import sys
+
+# The benchmark's stand-in StreamElements and ElevenLabs servers, shared with the engine tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from elevenlabs.environment import ElevenLabsEnvironment  # noqa: E402
+from tts_engines import ELEVENLABS_RATE, SECONDS_PER_CHAR, StandInHandler, start_standin_server  # noqa: E402
+
+__all__ = ["ELEVENLABS_RATE", "SECONDS_PER_CHAR", "StandInHandler", "start_standin_server", "standin_url", "elevenlabs_environment"]
+
+
+def standin_url(server) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def elevenlabs_environment(url: str) -> ElevenLabsEnvironment:
+    # Not base_url, the client turns that into https on the default port
+    return ElevenLabsEnvironment(base=url, wss=url.replace("http", "ws", 1))
@@ -0,0 +1,19 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from db import engine
+
+
+def test_failed_query_does_not_leave_its_start_time():
+    async def run():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+            await conn.execute(text("SELECT 1"))
+            return list(conn.sync_connection.info.get("query_start", []))
+
+    assert asyncio.run(run()) == []
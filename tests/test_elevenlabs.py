@@ -0,0 +1,110 @@
+import json
+import asyncio
+
+import pytest
+from elevenlabs.client import AsyncElevenLabs
+
+from standin import ELEVENLABS_RATE, SECONDS_PER_CHAR, StandInHandler, elevenlabs_environment, start_standin_server, standin_url
+from tts import ElevenLabsTTS
+from tts.pcm import parse_wav_chunk
+
+TEXT = "Roll for initiative!"
+
+
+class DroppingHandler(StandInHandler):
+    # Promises two seconds of audio, sends one and hangs up
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        pcm = b"\x01\x00" * ELEVENLABS_RATE
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/pcm")
+        self.send_header("Content-Length", str(len(pcm) * 2))
+        self.end_headers()
+        self.wfile.write(pcm)
+        self.wfile.flush()
+        self.close_connection = True
+
+
+@pytest.fixture
+def standin():
+    server = start_standin_server()
+    yield standin_url(server)
+    server.shutdown()
+
+
+@pytest.fixture
+def dropping_standin():
+    server = start_standin_server(DroppingHandler)
+    yield standin_url(server)
+    server.shutdown()
+
+
+def engine(url: str) -> ElevenLabsTTS:
+    tts = ElevenLabsTTS()
+    tts.client = AsyncElevenLabs(api_key="test", environment=elevenlabs_environment(url))
+    return tts
+
+
+def collect(stream) -> list:
+    async def run():
+        return [item async for item in stream]
+
+    return asyncio.run(run())
+
+
+def test_incremental_stream_forwards_all_audio(standin):
+    tts = engine(standin)
+    items = collect(tts._get_stream_incremental(TEXT, "test-voice"))
+
+    expected = int(max(0.5, len(TEXT) * SECONDS_PER_CHAR) * ELEVENLABS_RATE) * 2
+    pcm = b""
+    for chunk, duration in items:
+        _, data, (sample_rate, channels, bits) = parse_wav_chunk(chunk)
+        assert (sample_rate, channels, bits) == (ELEVENLABS_RATE, 1, 16)
+        assert duration == pytest.approx(len(data) / (ELEVENLABS_RATE * 2))
+        pcm += data
+    assert len(pcm) == expected
+    # Handed over in jitter buffer sized pieces, not all at the end
+    assert len(items) > 1
+
+
+def test_full_stream_matches_incremental(standin):
+    tts = engine(standin)
+    full = b"".join(parse_wav_chunk(chunk)[1] for chunk, _ in collect(tts._get_stream_full(TEXT, "test-voice")))
+    incremental = b"".join(parse_wav_chunk(chunk)[1] for chunk, _ in collect(tts._get_stream_incremental(TEXT, "test-voice")))
+    assert full == incremental
+
+
+def test_dropped_stream_ends_the_utterance(dropping_standin):
+    tts = engine(dropping_standin)
+    items = collect(tts._get_stream_incremental(TEXT, "test-voice"))
+
+    # What arrived is still played, then the failure marker keeps it out of the utterance cache
+    assert items[-1] == (None, None)
+    received = b"".join(parse_wav_chunk(chunk)[1] for chunk, _ in items[:-1])
+    # httpx may drop the read that hit the hang up, whatever it did hand over is kept in order
+    assert received and (b"\x01\x00" * ELEVENLABS_RATE).startswith(received)
+
+
+def test_request_carries_text_and_model():
+    received = []
+
+    class RecordingHandler(StandInHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            received.append((self.path, json.loads(body)))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = start_standin_server(RecordingHandler)
+    try:
+        collect(engine(standin_url(server))._get_stream_incremental(TEXT, "test-voice"))
+    finally:
+        server.shutdown()
+    path, body = received[0]
+    assert path.startswith("/v1/text-to-speech/test-voice/stream")
+    assert "output_format=pcm_22050" in path
+    assert body["text"] == TEXT
+    assert body["model_id"] == "eleven_flash_v2_5"
@@ -0,0 +1,51 @@
+import asyncio
+
+from server.fanout import AudioClient
+from server.protocol import UtteranceEncoder, FRAME_FORMAT, FRAME_PCM
+from tts.tts import TTS, create_wav_header
+
+
+class FakeWebsocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send(self, frame):
+        self.frames.append(frame)
+
+
+def max_size_chunk() -> tuple[bytes, float]:
+    pcm = b"\x00" * TTS.max_chunk_size
+    duration = len(pcm) / (TTS.sample_rate * TTS.num_channels * TTS.bits_per_sample // 8)
+    return create_wav_header(TTS.sample_rate, TTS.bits_per_sample, TTS.num_channels, len(pcm)) + pcm, duration
+
+
+def test_max_size_chunk_is_not_skipped():
+    chunk, duration = max_size_chunk()
+    client = AudioClient(FakeWebsocket(), "pcm", max_behind=5.0)
+    assert duration > client.max_behind
+
+    encoder = UtteranceEncoder(1)
+    client.push(encoder.encode(chunk), duration)
+    assert client.behind == duration
+
+    async def send_all():
+        task = asyncio.create_task(client.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(send_all())
+    assert [frame[1] for frame in client.websocket.frames] == [FRAME_FORMAT, FRAME_PCM]
+    assert client.behind == 0
+
+
+def test_backlog_over_max_behind_skips_ahead_keeping_format_frames():
+    chunk, duration = max_size_chunk()
+    client = AudioClient(FakeWebsocket(), "pcm", max_behind=5.0)
+    encoder = UtteranceEncoder(1)
+    client.push(encoder.encode(chunk), duration)
+    client.push(encoder.encode(chunk), duration)
+
+    # The first chunk was never sent, so only its format frame survives next to the newest audio
+    assert client.behind == duration
+    frames = [frame for frames, _ in client._pending for frame in frames]  # pylint: disable=protected-access
+    assert [frame[1] for frame in frames] == [FRAME_FORMAT, FRAME_PCM]
@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+
+import numpy as np
+
+from helpers.constants import TTS_SOURCE
+from tts.loudness import LoudnessNormalizer, integrated_loudness, pcm16_to_mono
+from tts.pcm import apply_limited_gain, parse_wav_chunk
+from tts.tts import create_wav_header
+
+SAMPLE_RATE = 22050
+
+
+def tone(seconds: float, amplitude: float, frequency: float = 440.0) -> bytes:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t) * 32767).astype("<i2").tobytes()
+
+
+def wav_chunks(pcm: bytes, chunk_seconds: float = 0.25) -> list[tuple[bytes, float]]:
+    size = int(chunk_seconds * SAMPLE_RATE) * 2
+    return [
+        (create_wav_header(SAMPLE_RATE, 16, 1, len(pcm[i : i + size])) + pcm[i : i + size], len(pcm[i : i + size]) / (2 * SAMPLE_RATE))
+        for i in range(0, len(pcm), size)
+    ]
+
+
+def normalize(normalizer: LoudnessNormalizer, voice_id: str, chunks: list) -> bytes:
+    async def stream():
+        for item in chunks:
+            yield item
+
+    async def collect():
+        return [chunk async for chunk, _ in normalizer.normalize(TTS_SOURCE.SOURCE_SE, voice_id, stream())]
+
+    return b"".join(parse_wav_chunk(chunk)[1] for chunk in asyncio.run(collect()))
+
+
+def test_limited_gain_has_no_steps_between_chunks():
+    # Loud enough that the limiter has work to do in every chunk
+    pcm = tone(2.0, 0.5)
+    whole = apply_limited_gain(pcm, 12.0)
+    split = b"".join(apply_limited_gain(pcm[i : i + 4410], 12.0) for i in range(0, len(pcm), 4410))
+    assert whole == split
+    assert np.abs(np.frombuffer(whole, dtype="<i2")).max() <= 32767
+
+
+def test_quiet_voice_is_leveled_with_one_gain():
+    normalizer = LoudnessNormalizer()
+    voice_id = f"se.{uuid.uuid4()}"
+    pcm = tone(3.0, 0.05)
+    out = normalize(normalizer, voice_id, wav_chunks(pcm))
+
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    leveled = np.frombuffer(out, dtype="<i2").astype(np.float64)
+    ratio = leveled[samples != 0] / samples[samples != 0]
+    # A single gain for the whole utterance, held back chunks included
+    assert np.ptp(ratio[np.abs(samples[samples != 0]) > 100]) < 0.05
+    assert abs(integrated_loudness(pcm16_to_mono(out, 1), SAMPLE_RATE) + 16.0) < 1.0
+
+
+def test_voice_measurement_keeps_updating():
+    normalizer = LoudnessNormalizer()
+    voice_id = f"se.{uuid.uuid4()}"
+    normalize(normalizer, voice_id, wav_chunks(tone(1.5, 0.05)))
+    first = normalizer.voice(TTS_SOURCE.SOURCE_SE, voice_id).lufs
+    blocks = normalizer.voice(TTS_SOURCE.SOURCE_SE, voice_id).blocks
+
+    normalize(normalizer, voice_id, wav_chunks(tone(3.0, 0.2)))
+    measured = normalizer.voice(TTS_SOURCE.SOURCE_SE, voice_id)
+    assert measured.blocks > blocks
+    assert measured.lufs > first
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("av")
+
+from server.opus import OpusUtteranceEncoder, OPUS_SAMPLE_RATE  # noqa: E402
+from server.protocol import FRAME_HEADER, FORMAT_PAYLOAD, FRAME_FORMAT, FRAME_PCM, FRAME_OPUS  # noqa: E402
+from tts.tts import create_wav_header  # noqa: E402
+
+SAMPLE_RATE = 22050
+
+
+def chunk(bits_per_sample: int, seconds: float = 0.2) -> bytes:
+    count = int(SAMPLE_RATE * seconds)
+    if bits_per_sample == 8:
+        pcm = np.full(count, 128, dtype=np.uint8).tobytes()
+    else:
+        pcm = (np.sin(np.arange(count) / 10) * 8000).astype("<i2").tobytes()
+    return create_wav_header(SAMPLE_RATE, bits_per_sample, 1, len(pcm)) + pcm
+
+
+def formats_in_effect(frames: list[bytes]) -> list[tuple[int, tuple]]:
+    """(frame type, format the overlay would decode it with) for every audio frame."""
+    current = None
+    out = []
+    for frame in frames:
+        frame_type = frame[1]
+        payload = frame[FRAME_HEADER.size :]
+        if frame_type == FRAME_FORMAT:
+            current = FORMAT_PAYLOAD.unpack(payload)
+        else:
+            out.append((frame_type, current))
+    return out
+
+
+def test_uncompressed_fallback_is_tagged_with_its_own_format():
+    encoder = OpusUtteranceEncoder(1)
+    frames = encoder.encode(chunk(8))
+    assert formats_in_effect(frames) == [(FRAME_PCM, (SAMPLE_RATE, 1, 8))]
+
+
+def test_opus_after_fallback_gets_its_format_back():
+    encoder = OpusUtteranceEncoder(1)
+    frames = encoder.encode(chunk(16)) + encoder.encode(chunk(8)) + encoder.encode(chunk(16)) + encoder.end()
+
+    opus_format = (OPUS_SAMPLE_RATE, 1, 16)
+    for frame_type, wav_format in formats_in_effect(frames):
+        if frame_type == FRAME_OPUS:
+            assert wav_format == opus_format
+        elif frame_type == FRAME_PCM:
+            assert wav_format == (SAMPLE_RATE, 1, 8)
+    assert FRAME_PCM in [frame_type for frame_type, _ in formats_in_effect(frames)]
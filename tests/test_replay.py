@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from server import replay as replay_module
+from server.replay import UtteranceReplay
+from server.protocol import UtteranceEncoder, FRAME_HEADER, FRAME_FORMAT, FRAME_PCM, FRAME_OPUS
+from tts.tts import create_wav_header
+
+SAMPLE_RATE = 22050
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(replay_module.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def second_of_audio(value: int) -> bytes:
+    pcm = np.full(SAMPLE_RATE, value, dtype="<i2").tobytes()
+    return create_wav_header(SAMPLE_RATE, 16, 1, len(pcm)) + pcm
+
+
+def make_encoder(codec: str, utterance_id: int) -> UtteranceEncoder:
+    if codec == "opus":
+        from server.opus import OpusUtteranceEncoder  # pylint: disable=import-outside-toplevel
+
+        return OpusUtteranceEncoder(utterance_id)
+    return UtteranceEncoder(utterance_id)
+
+
+def spoken(clock: FakeClock, codecs: set) -> UtteranceReplay:
+    replay = UtteranceReplay(1, make_encoder)
+    replay.encode(codecs, second_of_audio(1), 1.0)
+    replay.encode(codecs, second_of_audio(2), 1.0)
+    # Half way through the second chunk
+    clock.now += 1.5
+    return replay
+
+
+def pcm_of(frames: list[bytes]) -> bytes:
+    return b"".join(frame[FRAME_HEADER.size :] for frame in frames if frame[1] == FRAME_PCM)
+
+
+@pytest.mark.parametrize("codec", ["pcm", "pcm-joining"])
+def test_resume_starts_at_the_playback_position(clock, codec):
+    replay = spoken(clock, {"pcm"})
+    frames, remaining = replay.resume(codec)
+
+    assert frames[0][1] == FRAME_FORMAT
+    assert remaining == pytest.approx(0.5, abs=1e-3)
+    # Only the unheard half of the second chunk
+    assert pcm_of(frames) == np.full(SAMPLE_RATE // 2, 2, dtype="<i2").tobytes()
+
+
+def test_resume_before_playback_starts_sends_everything(clock):
+    replay = UtteranceReplay(1, make_encoder)
+    replay.encode({"pcm"}, second_of_audio(1), 1.0)
+    frames, remaining = replay.resume("pcm")
+    assert remaining == pytest.approx(1.0)
+    assert pcm_of(frames) == second_of_audio(1)[44:]
+
+
+def test_resume_trims_opus_to_the_packet(clock):
+    pytest.importorskip("av")
+    replay = spoken(clock, {"opus"})
+    full = [frame for _, _, encoded in replay._chunks[1:] for frame in encoded["opus"] if frame[1] == FRAME_OPUS]
+    frames, remaining = replay.resume("opus")
+
+    packets = [frame for frame in frames if frame[1] == FRAME_OPUS]
+    assert remaining == pytest.approx(0.5, abs=0.02)
+    # The last half second of packets, 20ms each
+    assert packets == full[-len(packets) :]
+    assert abs(len(packets) - (len(full) - 25)) <= 1
@@ -0,0 +1,62 @@
+from tts.segmenter import split_segments
+
+
+def test_empty_input_has_no_segments():
+    assert split_segments("") == []
+    assert split_segments("   \n\t ") == []
+
+
+def test_short_message_is_one_segment():
+    assert split_segments("Hello there.") == ["Hello there."]
+
+
+def test_splits_at_sentence_ends():
+    text = "The dragon wakes from its slumber. Everyone run for the door! Did anyone grab the gold?"
+    assert split_segments(text) == [
+        "The dragon wakes from its slumber.",
+        "Everyone run for the door!",
+        "Did anyone grab the gold?",
+    ]
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    text = "Dr. Smith met Mr. Jones at the gate. They argued about the price of the sword."
+    assert split_segments(text) == ["Dr. Smith met Mr. Jones at the gate.", "They argued about the price of the sword."]
+
+
+def test_decimals_do_not_end_a_sentence():
+    text = "The potion costs 3.50 gold and weighs 0.5 pounds. The merchant will not haggle today."
+    assert split_segments(text) == ["The potion costs 3.50 gold and weighs 0.5 pounds.", "The merchant will not haggle today."]
+
+
+def test_ellipsis_before_lowercase_continues_the_sentence():
+    text = "Wait... what was that noise in the dark? Well... I guess we should go and look."
+    assert split_segments(text) == ["Wait... what was that noise in the dark?", "Well... I guess we should go and look."]
+
+
+def test_short_pieces_are_joined_onto_the_next():
+    text = "Yes. No. The dragon wakes and the whole cave begins to shake around us."
+    assert split_segments(text) == [text]
+
+
+def test_long_sentence_splits_at_clauses():
+    text = "First we go north, then we cross the river, then we climb the hill, then we rest."
+    assert split_segments(text, max_chars=40) == [
+        "First we go north,",
+        "then we cross the river,",
+        "then we climb the hill,",
+        "then we rest.",
+    ]
+
+
+def test_long_sentence_without_clauses_splits_at_spaces():
+    text = "We walk " + "and walk " * 60 + "until dawn."
+    segments = split_segments(text, max_chars=80)
+    assert len(segments) > 1
+    assert all(len(segment) <= 80 for segment in segments)
+    assert " ".join(segments) == text
+
+
+def test_unbroken_text_is_cut_at_max_chars():
+    segments = split_segments("a" * 250, max_chars=100)
+    assert segments == ["a" * 100, "a" * 100, "a" * 50]
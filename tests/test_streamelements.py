@@ -0,0 +1,179 @@
+import io
+import shutil
+import asyncio
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from pydub import AudioSegment
+
+from standin import SECONDS_PER_CHAR, StandInHandler, start_standin_server, standin_url
+from helpers.instance_manager import get_config
+from tts import StreamElementsTTS
+from tts.pcm import parse_wav_chunk
+
+TEXT = "Roll for initiative!"
+
+
+def has_ffmpeg() -> bool:
+    # The app adds static_ffmpeg's binaries at startup, it downloads them on first use
+    try:
+        import static_ffmpeg  # pylint: disable=import-outside-toplevel
+
+        static_ffmpeg.add_paths()
+    except Exception:
+        pass
+    return shutil.which("ffmpeg") is not None
+
+
+needs_ffmpeg = pytest.mark.skipif(not has_ffmpeg(), reason="ffmpeg is needed to decode the stand-in's mp3")
+
+
+class FailingHandler(StandInHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.send_error(500)
+
+
+@pytest.fixture
+def pcm_output():
+    config = get_config(name="default")
+    yield lambda enabled: config.set(section="STREAMELEMENTS", option="pcm_output", value=str(enabled).lower())
+    config.set(section="STREAMELEMENTS", option="pcm_output", value="true")
+
+
+@pytest.fixture
+def normalize_loudness():
+    config = get_config(name="default")
+    yield lambda enabled: config.set(section="TTS", option="normalize_loudness", value=str(enabled).lower())
+    config.set(section="TTS", option="normalize_loudness", value="true")
+
+
+def engine(server) -> StreamElementsTTS:
+    tts = StreamElementsTTS()
+    tts.url = f"{standin_url(server)}/speech?"
+    return tts
+
+
+@pytest.fixture
+def standin():
+    server = start_standin_server()
+    yield server
+    server.shutdown()
+
+
+def collect(tts: StreamElementsTTS, stream) -> list:
+    async def run():
+        try:
+            return [item async for item in stream]
+        finally:
+            await tts.aclose()
+
+    return asyncio.run(run())
+
+
+def expected_seconds(text: str) -> float:
+    return max(0.5, len(text) * SECONDS_PER_CHAR)
+
+
+@needs_ffmpeg
+def test_pcm_output_streams_wav_chunks(standin, pcm_output):
+    pcm_output(True)
+    tts = engine(standin)
+    items = collect(tts, tts.get_stream(TEXT, "se.Brian"))
+
+    assert items
+    total = 0.0
+    for chunk, duration in items:
+        _, pcm, (sample_rate, channels, bits) = parse_wav_chunk(chunk)
+        assert (channels, bits) == (tts.num_channels, tts.bits_per_sample)
+        assert duration == pytest.approx(len(pcm) / (sample_rate * channels * bits // 8))
+        total += duration
+    assert total == pytest.approx(expected_seconds(TEXT), abs=0.1)
+
+
+@needs_ffmpeg
+def test_mp3_output_is_boosted_once(standin, pcm_output):
+    pcm_output(False)
+    tts = engine(standin)
+    items = collect(tts, tts.get_stream(TEXT, "se.Brian"))
+
+    assert len(items) == 1
+    chunk, duration = items[0]
+    assert duration == pytest.approx(expected_seconds(TEXT), abs=0.1)
+    boosted = AudioSegment.from_file(io.BytesIO(chunk), format="mp3")
+    # The stand-in's tone is at -12 dBFS, boost_db defaults to 6.2
+    assert boosted.max_dBFS > -12 + 5
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("normalizing", [True, False])
+def test_pcm_output_is_boosted_only_without_normalization(standin, pcm_output, normalize_loudness, normalizing):
+    pcm_output(True)
+    normalize_loudness(normalizing)
+    tts = engine(standin)
+    items = collect(tts, tts.get_stream(TEXT, "se.Brian"))
+
+    _, pcm, (sample_rate, channels, bits) = parse_wav_chunk(items[0][0])
+    audio = AudioSegment(data=pcm, sample_width=bits // 8, frame_rate=sample_rate, channels=channels)
+    # The stand-in's tone is at -12 dBFS, boost_db defaults to 6.2
+    if normalizing:
+        assert audio.max_dBFS == pytest.approx(-12, abs=1)
+    else:
+        assert audio.max_dBFS > -12 + 5
+
+
+@needs_ffmpeg
+def test_preview_uses_the_pooled_client(standin, pcm_output):
+    pcm_output(True)
+    tts = engine(standin)
+
+    async def run():
+        try:
+            audio = (await tts.audio_stream_generator(TEXT, "se.Brian")).getvalue()
+            return audio, tts._http
+        finally:
+            await tts.aclose()
+
+    audio, client = asyncio.run(run())
+    assert parse_wav_chunk(audio) is not None
+    assert client is not None
+
+
+def test_request_carries_voice_and_text():
+    received = []
+
+    class RecordingHandler(StandInHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            received.append(parse_qs(urlparse(self.path).query))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = start_standin_server(RecordingHandler)
+    try:
+        tts = engine(server)
+        assert collect(tts, tts.get_stream(TEXT, "se.Brian")) == []
+    finally:
+        server.shutdown()
+    assert received == [{"voice": ["Brian"], "text": [TEXT]}]
+
+
+def test_server_error_yields_no_audio():
+    server = start_standin_server(FailingHandler)
+    try:
+        tts = engine(server)
+        assert collect(tts, tts.get_stream(TEXT, "se.Brian")) == []
+    finally:
+        server.shutdown()
+
+
+def test_aclose_closes_the_pooled_client(standin):
+    tts = engine(standin)
+
+    async def run():
+        client, _ = tts._get_http()
+        await tts.aclose()
+        return client
+
+    client = asyncio.run(run())
+    assert client.is_closed
+    assert tts._http is None